@@ -1,17 +1,40 @@
+import os
+import time
+from functools import partial
+
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from dash import Dash, dcc, html
 from dash.dependencies import Input, Output
 
-# --- 1. Configuración y Carga de Datos ---
-# El archivo siniestros_viales_limpios.csv contiene los datos pre-procesados
-DATA_PATH = 'siniestros_viales_limpios.csv'
-df = pd.read_csv(DATA_PATH)
+import dashboard_cube
+import query_backend
+import spatial_index
+import time_rollup
+from figure_cache import cache_from_env
+from instrumentation import peak_rss_mb, span
+from model_artifact import latest_model_info
+from data_store import CLEANED_DATA_CSV_PATH, CLEANED_DATA_PATH, DIAS_SEMANA, load_table
+
+# --- 1. Configuración ---
+# El archivo siniestros_viales_limpios.parquet contiene los datos pre-procesados.
+# DASHBOARD_DATA_PATH permite usar otra copia, p. ej. un Feather sin compresión que
+# se lee con memory-map y cuyas páginas comparten los workers.
+DATA_PATH = os.environ.get('DASHBOARD_DATA_PATH', CLEANED_DATA_PATH)
+DASHBOARD_COLUMNS = ['codigo_localidad', 'gravedad_binaria', 'dia_semana', 'hora_del_dia']
+HEX_INDEX_PATH = os.environ.get('DASHBOARD_HEX_INDEX_PATH', spatial_index.hex_index_path(CLEANED_DATA_PATH))
+TIME_ROLLUP_PATH = os.environ.get('DASHBOARD_TIME_ROLLUP_PATH', time_rollup.time_rollup_path(CLEANED_DATA_PATH))
 
-# Asegurar que las columnas de fecha/hora sean del tipo correcto
-df['fecha_hora_accidente'] = pd.to_datetime(df['fecha_hora_accidente'])
-df['dia_semana'] = pd.Categorical(df['dia_semana'], categories=['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo'], ordered=True)
+# Vista inicial del mapa y zoom a partir del cual se usa cada resolución de hexágonos
+MAP_CENTER = {'lat': 4.65, 'lon': -74.10}
+MAP_ZOOM = 10
+MAP_ZOOM_LEVELS = [(11.5, 0), (13.0, 1), (float('inf'), 2)]
+# Máximo de celdas enviadas al navegador por actualización del mapa
+MAP_MAX_CELLS = 3000
+# Máximo de puntos por serie en la gráfica temporal, sin importar el rango de fechas
+SERIES_MAX_POINTS = 600
 
 # Mapeo de Localidades (ejemplo simplificado, se asume que el código es el nombre)
 localidad_map = {
@@ -21,97 +44,166 @@ localidad_map = {
     15: 'Antonio Nariño', 16: 'Puente Aranda', 17: 'La Candelaria', 18: 'Rafael Uribe Uribe',
     19: 'Ciudad Bolívar', 20: 'Sumapaz'
 }
-df['nombre_localidad'] = df['codigo_localidad'].map(localidad_map).fillna('Desconocida')
 
-# --- 2. Inicialización de la Aplicación Dash ---
-app = Dash(__name__, external_stylesheets=['https://codepen.io/chriddyp/pen/bWLwgP.css'])
+
+# --- 2. Carga de Datos ---
+
+def load_dashboard_data(data_path=DATA_PATH, backend=None):
+    """
+    Lee solo las columnas del dashboard con tipos compactos (int8 / category).
+
+    Con el backend DuckDB no se leen las filas sino los conteos por combinación de columnas
+    (columna 'conteo'), agrupados por DuckDB sobre el Parquet.
+    """
+    if query_backend.resolve_backend(backend, data_path) == 'duckdb':
+        df = query_backend.group_counts(DASHBOARD_COLUMNS, data_path, backend='duckdb').rename('conteo').reset_index()
+    else:
+        df = load_table(data_path, columns=DASHBOARD_COLUMNS, csv_fallback=CLEANED_DATA_CSV_PATH, memory_map=True)
+    df = df.astype({
+        'gravedad_binaria': 'int8',
+        'hora_del_dia': 'Int8',
+        # Asegurar el orden de los días (también cuando se lee el CSV heredado)
+        'dia_semana': pd.CategoricalDtype(DIAS_SEMANA, ordered=True),
+    })
+    df['nombre_localidad'] = df['codigo_localidad'].map(localidad_map).fillna('Desconocida').astype('category')
+    return df
+
 
 # --- 3. Definición del Layout del Dashboard ---
-app.layout = html.Div(style={'backgroundColor': '#f8f9fa', 'padding': '20px'}, children=[
-    html.H1("Dashboard de Analítica Predictiva de Siniestralidad Vial en Bogotá", 
-            style={'textAlign': 'center', 'color': '#343a40'}),
+
+def format_metric(model_info, name):
+    if not model_info or name not in model_info['metrics']:
+        return "n/d"
+    return f"{model_info['metrics'][name]:.2f}"
+
+
+# Interpretación del ROC AUC (bandas de Hosmer y Lemeshow): límite inferior de cada banda
+DISCRIMINATION_LEVELS = [(0.9, "excelente"), (0.8, "buena"), (0.7, "aceptable"), (0.0, "baja")]
+
+
+def describe_discrimination(model_info):
+    """Frase sobre la capacidad de discriminación según el ROC AUC del modelo cargado ('' sin métrica)."""
+    if not model_info or 'roc_auc' not in model_info['metrics']:
+        return ""
+    roc_auc = model_info['metrics']['roc_auc']
+    level = next(label for threshold, label in DISCRIMINATION_LEVELS if roc_auc >= threshold)
+    return f"Con un ROC AUC de {roc_auc:.2f}, la capacidad de discriminación del modelo es {level}."
+
+
+def date_slider_marks(first_day, last_day):
+    """Marcas del selector de fechas (días desde `first_day`): por año, o por mes si el rango es corto."""
+    freq = 'YS' if (last_day - first_day).days > 730 else 'MS'
+    label = '%Y' if freq == 'YS' else '%Y-%m'
+    return {(day - first_day).days: day.strftime(label)
+            for day in pd.date_range(first_day, last_day, freq=freq)}
+
+
+def build_layout(app, localidades, model_info=None, show_map=False, series_dates=None):
+    return html.Div(style={'backgroundColor': '#f8f9fa', 'padding': '20px'}, children=[
+        html.H1("Dashboard de Analítica Predictiva de Siniestralidad Vial en Bogotá", 
+                style={'textAlign': 'center', 'color': '#343a40'}),
     
-    html.Div([
         html.Div([
-            html.Label("Seleccionar Localidad:", style={'fontWeight': 'bold'}),
-            dcc.Dropdown(
-                id='localidad-dropdown',
-                options=[{'label': loc, 'value': loc} for loc in sorted(df['nombre_localidad'].unique())],
-                value=sorted(df['nombre_localidad'].unique()),
-                multi=True
-            ),
-        ], style={'width': '49%', 'display': 'inline-block', 'padding': '10px'}),
+            html.Div([
+                html.Label("Seleccionar Localidad:", style={'fontWeight': 'bold'}),
+                dcc.Dropdown(
+                    id='localidad-dropdown',
+                    options=[{'label': loc, 'value': loc} for loc in localidades],
+                    value=list(localidades),
+                    multi=True
+                ),
+            ], style={'width': '49%', 'display': 'inline-block', 'padding': '10px'}),
         
+            html.Div([
+                html.Label("Seleccionar Gravedad:", style={'fontWeight': 'bold'}),
+                dcc.Dropdown(
+                    id='gravedad-dropdown',
+                    options=[
+                        {'label': 'Alta Gravedad (Lesionado/Muerto)', 'value': 1},
+                        {'label': 'Baja Gravedad (Solo Daños)', 'value': 0}
+                    ],
+                    value=[0, 1],
+                    multi=True
+                ),
+            ], style={'width': '49%', 'display': 'inline-block', 'padding': '10px'}),
+        ], style={'marginBottom': '20px', 'backgroundColor': 'white', 'padding': '10px', 'borderRadius': '5px'}),
+
+        # Fila 1: Análisis Temporal
         html.Div([
-            html.Label("Seleccionar Gravedad:", style={'fontWeight': 'bold'}),
-            dcc.Dropdown(
-                id='gravedad-dropdown',
-                options=[
-                    {'label': 'Alta Gravedad (Lesionado/Muerto)', 'value': 1},
-                    {'label': 'Baja Gravedad (Solo Daños)', 'value': 0}
-                ],
-                value=[0, 1],
-                multi=True
-            ),
-        ], style={'width': '49%', 'display': 'inline-block', 'padding': '10px'}),
-    ], style={'marginBottom': '20px', 'backgroundColor': 'white', 'padding': '10px', 'borderRadius': '5px'}),
-
-    # Fila 1: Análisis Temporal
-    html.Div([
-        html.Div([
-            html.H3("1. Mapa de Calor Temporal (Hora vs. Día)", style={'textAlign': 'center'}),
-            dcc.Graph(id='heatmap-temporal'),
-        ], style={'width': '49%', 'display': 'inline-block', 'padding': '10px', 'backgroundColor': 'white', 'borderRadius': '5px', 'boxShadow': '2px 2px 2px lightgrey'}),
+            html.Div([
+                html.H3("1. Mapa de Calor Temporal (Hora vs. Día)", style={'textAlign': 'center'}),
+                dcc.Graph(id='heatmap-temporal'),
+            ], style={'width': '49%', 'display': 'inline-block', 'padding': '10px', 'backgroundColor': 'white', 'borderRadius': '5px', 'boxShadow': '2px 2px 2px lightgrey'}),
         
-        html.Div([
-            html.H3("2. Distribución de Gravedad", style={'textAlign': 'center'}),
-            dcc.Graph(id='gravedad-distribucion'),
-        ], style={'width': '49%', 'display': 'inline-block', 'padding': '10px', 'backgroundColor': 'white', 'borderRadius': '5px', 'boxShadow': '2px 2px 2px lightgrey'}),
-    ], style={'display': 'flex', 'justifyContent': 'space-between', 'marginBottom': '20px'}),
+            html.Div([
+                html.H3("2. Distribución de Gravedad", style={'textAlign': 'center'}),
+                dcc.Graph(id='gravedad-distribucion'),
+            ], style={'width': '49%', 'display': 'inline-block', 'padding': '10px', 'backgroundColor': 'white', 'borderRadius': '5px', 'boxShadow': '2px 2px 2px lightgrey'}),
+        ], style={'display': 'flex', 'justifyContent': 'space-between', 'marginBottom': '20px'}),
 
-    # Fila 2: Análisis Geográfico y Métricas
-    html.Div([
+        # Fila 2: Análisis Geográfico y Métricas
         html.Div([
-            html.H3("3. Siniestros por Localidad", style={'textAlign': 'center'}),
-            dcc.Graph(id='localidad-bar-chart'),
-        ], style={'width': '49%', 'display': 'inline-block', 'padding': '10px', 'backgroundColor': 'white', 'borderRadius': '5px', 'boxShadow': '2px 2px 2px lightgrey'}),
+            html.Div([
+                html.H3("3. Siniestros por Localidad", style={'textAlign': 'center'}),
+                dcc.Graph(id='localidad-bar-chart'),
+            ], style={'width': '49%', 'display': 'inline-block', 'padding': '10px', 'backgroundColor': 'white', 'borderRadius': '5px', 'boxShadow': '2px 2px 2px lightgrey'}),
         
-        html.Div([
-            html.H3("4. Métricas Clave del Modelo Predictivo", style={'textAlign': 'center'}),
             html.Div([
-                html.P(f"ROC AUC Score: 0.76", style={'fontSize': '1.2em', 'fontWeight': 'bold', 'color': '#007bff'}),
-                html.P(f"Recall (Alta Gravedad): 0.88", style={'fontSize': '1.2em', 'fontWeight': 'bold', 'color': '#28a745'}),
-                html.P("El modelo tiene una capacidad de discriminación moderada a buena.", style={'fontSize': '0.9em', 'color': '#6c757d'}),
-                html.Img(src=app.get_asset_url('roc_curve.png'), style={'width': '100%', 'marginTop': '10px'})
-            ], style={'padding': '20px', 'textAlign': 'left'}),
-        ], style={'width': '49%', 'display': 'inline-block', 'padding': '10px', 'backgroundColor': 'white', 'borderRadius': '5px', 'boxShadow': '2px 2px 2px lightgrey'}),
-    ], style={'display': 'flex', 'justifyContent': 'space-between'}),
-])
-
-# --- 4. Callbacks para la Interactividad ---
-
-@app.callback(
-    [Output('heatmap-temporal', 'figure'),
-     Output('gravedad-distribucion', 'figure'),
-     Output('localidad-bar-chart', 'figure')],
-    [Input('localidad-dropdown', 'value'),
-     Input('gravedad-dropdown', 'value')]
-)
-def update_graphs(selected_localidades, selected_gravedad):
-    # Filtrar datos
-    filtered_df = df[
-        df['nombre_localidad'].isin(selected_localidades) & 
-        df['gravedad_binaria'].isin(selected_gravedad)
-    ]
+                html.H3("4. Métricas Clave del Modelo Predictivo", style={'textAlign': 'center'}),
+                html.Div([
+                    html.P(f"ROC AUC Score: {format_metric(model_info, 'roc_auc')}", style={'fontSize': '1.2em', 'fontWeight': 'bold', 'color': '#007bff'}),
+                    html.P(f"Recall (Alta Gravedad): {format_metric(model_info, 'recall')}", style={'fontSize': '1.2em', 'fontWeight': 'bold', 'color': '#28a745'}),
+                    html.P(f"Modelo v{model_info['version']} entrenado el {model_info['created_at']}." if model_info
+                           else "No hay un modelo entrenado; ejecuta modeling.py.", style={'fontSize': '0.9em', 'color': '#6c757d'}),
+                    html.P(describe_discrimination(model_info), style={'fontSize': '0.9em', 'color': '#6c757d'}),
+                    html.Img(src=app.get_asset_url('roc_curve.png'), style={'width': '100%', 'marginTop': '10px'})
+                ], style={'padding': '20px', 'textAlign': 'left'}),
+            ], style={'width': '49%', 'display': 'inline-block', 'padding': '10px', 'backgroundColor': 'white', 'borderRadius': '5px', 'boxShadow': '2px 2px 2px lightgrey'}),
+        ], style={'display': 'flex', 'justifyContent': 'space-between'}),
+
+        # Fila 3: Puntos Críticos (índice hexagonal)
+        html.Div([
+            html.H3("5. Puntos Críticos de Siniestralidad (Hexágonos)", style={'textAlign': 'center'}),
+            html.Label("Rango de horas:", style={'fontWeight': 'bold'}),
+            dcc.RangeSlider(id='hora-rango', min=0, max=23, step=1, value=[0, 23],
+                            marks={h: str(h) for h in range(0, 24, 3)}),
+            dcc.Graph(id='mapa-hexagonos', style={'height': '600px'}),
+        ] if show_map else [
+            html.H3("5. Puntos Críticos de Siniestralidad (Hexágonos)", style={'textAlign': 'center'}),
+            html.P("No hay un índice espacial con coordenadas dentro de Bogotá; ejecuta data_preparation.py con "
+                   "un archivo que tenga latitud y longitud.", style={'color': '#6c757d'}),
+        ], style={'marginTop': '20px', 'padding': '10px', 'backgroundColor': 'white', 'borderRadius': '5px', 'boxShadow': '2px 2px 2px lightgrey'}),
+
+        # Fila 4: Evolución Temporal (serie multirresolución)
+        html.Div([
+            html.H3("6. Evolución de los Siniestros en el Tiempo", style={'textAlign': 'center'}),
+            html.Label("Rango de fechas:", style={'fontWeight': 'bold'}),
+            dcc.RangeSlider(id='fecha-rango', min=0, max=(series_dates[1] - series_dates[0]).days, step=1,
+                            value=[0, (series_dates[1] - series_dates[0]).days],
+                            marks=date_slider_marks(*series_dates)),
+            dcc.Graph(id='serie-temporal'),
+        ] if series_dates else [
+            html.H3("6. Evolución de los Siniestros en el Tiempo", style={'textAlign': 'center'}),
+            html.P("No se encontró la serie temporal; ejecuta data_preparation.py para generarla.",
+                   style={'color': '#6c757d'}),
+        ], style={'marginTop': '20px', 'padding': '10px', 'backgroundColor': 'white', 'borderRadius': '5px', 'boxShadow': '2px 2px 2px lightgrey'}),
+    ])
+
+
+# --- 4. Gráficos a partir del Cubo de Conteos ---
+
+def build_figures(count_cube, cube_localidades, selected_localidades, selected_gravedad):
+    # Filtrar datos: rebanada del cubo de conteos para la selección
+    sub_cube = dashboard_cube.slice_cube(count_cube, cube_localidades, selected_localidades, selected_gravedad)
 
     # --- Gráfico 1: Mapa de Calor Temporal ---
-    # Asegurar que los datos para el heatmap sean numéricos y no tengan NaNs
-    heatmap_data = filtered_df.groupby(['dia_semana', 'hora_del_dia']).size().reset_index(name='conteo')
-    heatmap_data['conteo'] = heatmap_data['conteo'].fillna(0).astype(int)
-    
-    # Asegurar que el eje Y (días) esté en el orden correcto
-    heatmap_data['dia_semana'] = pd.Categorical(heatmap_data['dia_semana'], categories=['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo'], ordered=True)
-    heatmap_data = heatmap_data.sort_values('dia_semana')
+    # Matriz 7 × 24 en formato largo; los días ya siguen el orden del cubo (Lunes a Domingo)
+    heatmap_matrix = dashboard_cube.heatmap_counts(sub_cube)
+    heatmap_data = pd.DataFrame({
+        'dia_semana': np.repeat(DIAS_SEMANA, heatmap_matrix.shape[1]),
+        'hora_del_dia': np.tile(np.arange(heatmap_matrix.shape[1]), len(DIAS_SEMANA)),
+        'conteo': heatmap_matrix.ravel(),
+    })
 
     fig_heatmap = px.density_heatmap(
         heatmap_data, 
@@ -125,9 +217,9 @@ def update_graphs(selected_localidades, selected_gravedad):
     fig_heatmap.update_layout(xaxis={'dtick': 1}) # Mostrar todas las horas
 
     # --- Gráfico 2: Distribución de Gravedad ---
-    gravedad_counts = filtered_df['gravedad_binaria'].map({1: 'Alta Gravedad', 0: 'Baja Gravedad'}).value_counts().reset_index(name='Conteo')
-    gravedad_counts.columns = ['Gravedad', 'Conteo']
-    
+    gravedad_counts = pd.DataFrame({'Gravedad': ['Baja Gravedad', 'Alta Gravedad'], 'Conteo': dashboard_cube.gravedad_counts(sub_cube)})
+    gravedad_counts = gravedad_counts[gravedad_counts['Conteo'] > 0].sort_values('Conteo', ascending=False)
+
     fig_gravedad = px.pie(
         gravedad_counts, 
         names='Gravedad', 
@@ -137,8 +229,8 @@ def update_graphs(selected_localidades, selected_gravedad):
     )
     
     # --- Gráfico 3: Siniestros por Localidad ---
-    localidad_counts = filtered_df['nombre_localidad'].value_counts().reset_index(name='Conteo')
-    localidad_counts.columns = ['Localidad', 'Conteo']
+    localidad_counts = pd.DataFrame({'Localidad': cube_localidades, 'Conteo': dashboard_cube.localidad_counts(sub_cube)})
+    localidad_counts = localidad_counts[localidad_counts['Conteo'] > 0]
     localidad_counts = localidad_counts.sort_values('Conteo', ascending=False).head(10) # Top 10
 
     fig_localidad = px.bar(
@@ -153,8 +245,167 @@ def update_graphs(selected_localidades, selected_gravedad):
 
     return fig_heatmap, fig_gravedad, fig_localidad
 
-# --- 5. Ejecución del Servidor ---
+
+def map_view(relayout_data):
+    """Resolución de hexágonos y vista (lat_min, lat_max, lon_min, lon_max) según el zoom del mapa."""
+    relayout_data = relayout_data or {}
+    center = relayout_data.get('map.center', MAP_CENTER)
+    zoom = relayout_data.get('map.zoom', MAP_ZOOM)
+    resolution = next(level for max_zoom, level in MAP_ZOOM_LEVELS if zoom < max_zoom)
+    # Extensión aproximada de la vista: ~1000 × 600 px con teselas de 512 px, más un margen
+    deg_per_px = 360 / (512 * 2 ** zoom)
+    half_lon, half_lat = 600 * deg_per_px, 360 * deg_per_px
+    # Redondeo para que vistas casi iguales compartan la entrada de la caché
+    bbox = tuple(round(v, 3) for v in (center['lat'] - half_lat, center['lat'] + half_lat,
+                                        center['lon'] - half_lon, center['lon'] + half_lon))
+    return resolution, bbox
+
+
+def build_map_figure(hex_index, resolution, hour_range, selected_gravedad, bbox):
+    """Mapa de hexágonos coloreados por número de siniestros en la vista y los filtros actuales."""
+    q, r, counts = hex_index.query(resolution, hour_range, selected_gravedad, bbox, max_cells=MAP_MAX_CELLS)
+    polygons = spatial_index.hex_polygons(q, r, spatial_index.RESOLUTIONS[resolution])
+    ids = [f"{a}_{b}" for a, b in zip(q, r)]
+    geojson = {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'id': cell_id, 'properties': {},
+         'geometry': {'type': 'Polygon', 'coordinates': [np.round(polygon, 5).tolist()]}}
+        for cell_id, polygon in zip(ids, polygons)]}
+
+    fig_map = go.Figure(go.Choroplethmap(
+        geojson=geojson, locations=ids, z=counts, colorscale='YlOrRd', marker_opacity=0.65,
+        marker_line_width=0, colorbar_title='Siniestros',
+        hovertemplate='%{z} siniestros<extra></extra>'))
+    fig_map.update_layout(
+        map={'style': 'carto-positron', 'center': MAP_CENTER, 'zoom': MAP_ZOOM},
+        # uirevision conserva el zoom y la posición del usuario entre actualizaciones
+        uirevision='mapa', margin={'l': 0, 'r': 0, 't': 30, 'b': 0},
+        title=f"Siniestros por hexágono (lado {spatial_index.RESOLUTIONS[resolution]:g} km, {len(ids)} celdas)")
+    return fig_map
+
+
+def build_series_figure(rollup, first_day, day_range, selected_localidades, selected_gravedad):
+    """Serie de siniestros por gravedad en el rango de días del selector (a lo sumo SERIES_MAX_POINTS puntos)."""
+    start = first_day + pd.Timedelta(days=day_range[0])
+    end = first_day + pd.Timedelta(days=day_range[1] + 1)
+    resolution, periods, counts = rollup.query(start, end, selected_localidades, selected_gravedad,
+                                               max_points=SERIES_MAX_POINTS)
+
+    fig_series = go.Figure()
+    for gravedad, name, color in [(1, 'Alta Gravedad', '#dc3545'), (0, 'Baja Gravedad', '#6c757d')]:
+        if gravedad in (selected_gravedad or []):
+            fig_series.add_trace(go.Bar(x=periods, y=counts[:, gravedad], name=name, marker_color=color))
+    fig_series.update_layout(
+        title=f"Siniestros por {time_rollup.RESOLUTION_LABELS[resolution]} "
+              f"({start:%Y-%m-%d} a {end - pd.Timedelta(days=1):%Y-%m-%d})",
+        xaxis_title='Fecha', yaxis_title='Conteo de Siniestros', barmode='stack', bargap=0.1,
+        hovermode='x unified')
+    return fig_series
+
+
+# --- 5. Fábrica de la Aplicación ---
+
+def create_app(data_path=DATA_PATH):
+    """
+    Crea la aplicación Dash: carga los datos, construye el cubo de conteos y registra los callbacks.
+
+    Los datos se cargan aquí y no al importar el módulo. Solo se conserva el cubo de
+    conteos; las filas se liberan, de modo que cada worker ocupa poca memoria y, con
+    `gunicorn --preload`, la carga se hace una sola vez antes del fork.
+    """
+    start = time.perf_counter()
+    with span('dashboard.carga') as sp:
+        df = load_dashboard_data(data_path)
+        sp.rows = n_rows = int(df['conteo'].sum()) if 'conteo' in df else len(df)
+
+    # Cubo de conteos localidad × gravedad × día × hora, calculado una sola vez al iniciar.
+    # Los callbacks solo suman rebanadas del cubo, sin importar cuántos siniestros haya.
+    count_cube, cube_localidades = dashboard_cube.build_count_cube(
+        df['nombre_localidad'], df['gravedad_binaria'], df['dia_semana'], df['hora_del_dia'], df.get('conteo'))
+    del df
+
+    # Caché de figuras por selección de filtros, invalidada cuando cambia el archivo de datos.
+    # Con DASH_CACHE_BACKEND=filesystem la comparten todos los workers de gunicorn.
+    figure_cache = cache_from_env(data_path if os.path.exists(data_path) else CLEANED_DATA_CSV_PATH)
+    compute_graphs = partial(build_figures, count_cube, cube_localidades)
+
+    # Índice hexagonal precalculado en la preparación (opcional)
+    hex_index = spatial_index.HexIndex.load(HEX_INDEX_PATH) if os.path.exists(HEX_INDEX_PATH) else None
+    # Sin coordenadas dentro de Bogotá el índice queda sin resoluciones: el mapa se oculta
+    if hex_index is not None and not hex_index.levels:
+        hex_index = None
+    # Serie temporal multirresolución precalculada en la preparación (opcional)
+    rollup = time_rollup.TimeRollup.load(TIME_ROLLUP_PATH, localidad_map) \
+        if os.path.exists(TIME_ROLLUP_PATH) else None
+    series_dates = rollup.date_range() if rollup is not None else None
+
+    app = Dash(__name__, external_stylesheets=['https://codepen.io/chriddyp/pen/bWLwgP.css'])
+    # Métricas del último modelo entrenado (models/latest.json), sin cargar el modelo
+    app.layout = build_layout(app, cube_localidades, latest_model_info(), show_map=hex_index is not None,
+                              series_dates=series_dates)
+
+    @app.server.route('/cache-stats')
+    def cache_stats():
+        # Contadores de aciertos/fallos de la caché de figuras (por proceso)
+        return figure_cache.stats()
+
+    # Callbacks para la Interactividad
+    @app.callback(
+        [Output('heatmap-temporal', 'figure'),
+         Output('gravedad-distribucion', 'figure'),
+         Output('localidad-bar-chart', 'figure')],
+        [Input('localidad-dropdown', 'value'),
+         Input('gravedad-dropdown', 'value')]
+    )
+    def update_graphs(selected_localidades, selected_gravedad):
+        with span('dashboard.update_graphs', localidades=len(selected_localidades or []),
+                  gravedad=selected_gravedad):
+            return figure_cache.get_or_compute(compute_graphs, selected_localidades, selected_gravedad)
+
+    if hex_index is not None:
+        def compute_map(_, resolution, hour_range, selected_gravedad, view):
+            return build_map_figure(hex_index, resolution[0], hour_range, selected_gravedad, view[0])
+
+        @app.callback(
+            Output('mapa-hexagonos', 'figure'),
+            [Input('gravedad-dropdown', 'value'),
+             Input('hora-rango', 'value'),
+             Input('mapa-hexagonos', 'relayoutData')]
+        )
+        def update_map(selected_gravedad, hour_range, relayout_data):
+            resolution, bbox = map_view(relayout_data)
+            with span('dashboard.update_map', resolucion=resolution):
+                # 'mapa' distingue estas entradas de las de update_graphs en la caché compartida
+                return figure_cache.get_or_compute(compute_map, ['mapa'], [resolution], hour_range,
+                                                   selected_gravedad, [bbox])
+
+    if series_dates is not None:
+        def compute_series(_, day_range, selected_localidades, selected_gravedad):
+            return build_series_figure(rollup, series_dates[0], day_range, selected_localidades, selected_gravedad)
+
+        @app.callback(
+            Output('serie-temporal', 'figure'),
+            [Input('localidad-dropdown', 'value'),
+             Input('gravedad-dropdown', 'value'),
+             Input('fecha-rango', 'value')]
+        )
+        def update_series(selected_localidades, selected_gravedad, day_range):
+            with span('dashboard.update_series', dias=day_range[1] - day_range[0] + 1):
+                # 'serie' distingue estas entradas de las demás en la caché compartida
+                return figure_cache.get_or_compute(compute_series, ['serie'], day_range, selected_localidades,
+                                                   selected_gravedad)
+
+    # La selección por defecto (todas las localidades, ambas gravedades) se calcula al iniciar
+    update_graphs(list(cube_localidades), [0, 1])
+
+    app.figure_cache = figure_cache
+    peak = peak_rss_mb()
+    memory = f", memoria residente máxima: {peak:.0f} MB" if peak is not None else ""
+    print(f"Dashboard listo en {time.perf_counter() - start:.2f} s ({n_rows} siniestros{memory}).")
+    return app
+
+
+# --- 6. Ejecución del Servidor ---
 if __name__ == '__main__':
     # El modo debug permite recargar automáticamente al guardar cambios
     # El puerto 8050 es el puerto estándar de Dash
-    app.run(debug=True, port=8050)
+    create_app().run(debug=True, port=8050)
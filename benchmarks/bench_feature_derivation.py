@@ -0,0 +1,92 @@
+"""
+Benchmark de la derivación de variables de `data_preparation.py`.
+
+Compara la implementación anterior (apply fila a fila, concatenación de textos sin
+formato, objetos date/time) con la vectorizada sobre un dataset sintético y reporta
+filas por segundo de cada una.
+
+Uso:
+    python benchmarks/bench_feature_derivation.py --filas 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_preparation import derive_features  # noqa: E402
+
+
+def legacy_derive_features(df):
+    """Derivación original, conservada solo como referencia para el benchmark."""
+    df['fecha_hora_accidente'] = pd.to_datetime(df['fecha'] + ' ' + df['hora'].astype(str), errors='coerce')
+    df['fecha_accidente'] = df['fecha_hora_accidente'].dt.date
+    df['hora_accidente'] = df['fecha_hora_accidente'].dt.time
+    dias_semana = {
+        0: 'Lunes', 1: 'Martes', 2: 'Miércoles', 3: 'Jueves',
+        4: 'Viernes', 5: 'Sábado', 6: 'Domingo'
+    }
+    df['dia_semana'] = df['fecha_hora_accidente'].dt.dayofweek.map(dias_semana)
+    df['mes'] = df['fecha_hora_accidente'].dt.month
+    df['anio'] = df['fecha_hora_accidente'].dt.year
+    df['hora_del_dia'] = df['fecha_hora_accidente'].dt.hour
+    df['gravedad_binaria'] = df['gravedad'].apply(lambda x: 1 if x in [2, 3] else 0)
+    return df
+
+
+def synthetic_frame(rows, seed=42):
+    """Columnas 'fecha', 'hora' y 'gravedad' tal como llegan del consolidado normalizado."""
+    rng = np.random.default_rng(seed)
+    timestamps = pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 8 * 365 * 86400, rows), unit='s')
+    return pd.DataFrame({
+        'fecha': timestamps.strftime('%Y-%m-%d'),
+        'hora': timestamps.strftime('%H:%M:%S'),
+        'gravedad': rng.choice([1, 2, 3], size=rows, p=[0.6, 0.38, 0.02]),
+    })
+
+
+def time_derivation(func, base, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        df = base.copy()
+        start = time.perf_counter()
+        result = func(df)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, default=1_000_000)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    base = synthetic_frame(args.filas)
+    print(f"Dataset sintético: {args.filas} filas (mejor de {args.repeticiones} repeticiones)\n")
+
+    legacy_time, legacy = time_derivation(legacy_derive_features, base, args.repeticiones)
+    vector_time, vectorized = time_derivation(derive_features, base, args.repeticiones)
+
+    # Ambas implementaciones deben producir los mismos valores
+    pd.testing.assert_series_equal(legacy['fecha_hora_accidente'], vectorized['fecha_hora_accidente'])
+    assert (legacy['gravedad_binaria'].to_numpy() == vectorized['gravedad_binaria'].to_numpy()).all()
+    assert (legacy['dia_semana'].to_numpy() == vectorized['dia_semana'].astype(str).to_numpy()).all()
+    assert (legacy['hora_del_dia'].to_numpy() == vectorized['hora_del_dia'].to_numpy()).all()
+
+    derived = ['fecha_hora_accidente', 'fecha_accidente', 'hora_accidente', 'dia_semana',
+               'mes', 'anio', 'hora_del_dia', 'gravedad_binaria']
+    legacy_mb = legacy[derived].memory_usage(deep=True).sum() / 2**20
+    vector_mb = vectorized[derived].memory_usage(deep=True).sum() / 2**20
+
+    print(f"{'Implementación':<15} {'Tiempo (s)':>10} {'Filas/s':>14} {'Memoria (MB)':>13}")
+    print(f"{'Anterior':<15} {legacy_time:>10.3f} {args.filas / legacy_time:>14,.0f} {legacy_mb:>13.1f}")
+    print(f"{'Vectorizada':<15} {vector_time:>10.3f} {args.filas / vector_time:>14,.0f} {vector_mb:>13.1f}")
+    print(f"\nAceleración: {legacy_time / vector_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark de las estrategias de desbalance de `imbalance.py` frente a SMOTE completo.
+
+Genera siniestros sintéticos (`synthetic_data.py`), los limpia y codifica igual que el
+pipeline, y para cada estrategia mide sobre el mismo 70/30 estratificado:
+  - tiempo de remuestreo + ajuste de la Regresión Logística;
+  - memoria pico asignada durante el remuestreo y el ajuste (tracemalloc);
+  - filas de entrenamiento resultantes, ROC AUC y recall de la clase Alta Gravedad.
+
+Uso:
+    python benchmarks/bench_imbalance.py --filas 500000
+    python benchmarks/bench_imbalance.py --filas 2000000 --estrategias pesos_balanceados submuestreo smote_aproximado
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import recall_score, roc_auc_score
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_preparation import derive_features, normalize_columns  # noqa: E402
+from feature_encoding import FEATURES, TARGET, encode, fit_encoder  # noqa: E402
+from imbalance import IMBALANCE_STRATEGIES, resample  # noqa: E402
+from modeling import split_data  # noqa: E402
+from synthetic_data import iter_synthetic_chunks  # noqa: E402
+
+
+def synthetic_training_data(rows, seed=42):
+    df = pd.concat(iter_synthetic_chunks(rows, seed=seed), ignore_index=True)
+    df = derive_features(normalize_columns(df))[FEATURES + [TARGET]]
+    encoder = fit_encoder(df)
+    return encode(df, encoder), df[TARGET].to_numpy(), df[FEATURES], encoder
+
+
+def bench_strategy(strategy, X_train, X_test, y_train, y_test, raw_train, encoder):
+    tracemalloc.start()
+    start = time.perf_counter()
+    X_res, y_res, class_weight = resample(strategy, X_train, y_train, raw_train, encoder)
+    model = LogisticRegression(max_iter=1000, random_state=42, solver='liblinear', class_weight=class_weight)
+    model.fit(X_res, y_res)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    y_proba = model.predict_proba(X_test)[:, 1]
+    return {
+        'estrategia': strategy,
+        'tiempo_s': elapsed,
+        'memoria_pico_mb': peak / 2**20,
+        'filas_entrenamiento': X_res.shape[0],
+        'roc_auc': roc_auc_score(y_test, y_proba),
+        'recall': recall_score(y_test, (y_proba >= 0.5).astype(int)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, default=200_000)
+    parser.add_argument('--estrategias', nargs='+', choices=IMBALANCE_STRATEGIES, default=IMBALANCE_STRATEGIES)
+    args = parser.parse_args()
+
+    X, y, raw, encoder = synthetic_training_data(args.filas)
+    X_train, X_test, y_train, y_test, raw_train, _ = split_data(X, y, raw)
+    print(f"Dataset sintético: {args.filas} filas, {X.shape[1]} columnas One-Hot, "
+          f"{y_train.mean():.1%} de Alta Gravedad en entrenamiento\n")
+
+    results = []
+    for strategy in args.estrategias:
+        print(f"Midiendo '{strategy}'...")
+        results.append(bench_strategy(strategy, X_train, X_test, y_train, y_test, raw_train, encoder))
+
+    table = pd.DataFrame(results).set_index('estrategia')
+    if 'smote' in table.index:
+        table['aceleracion_vs_smote'] = table.loc['smote', 'tiempo_s'] / table['tiempo_s']
+    print()
+    print(table.to_string(float_format=lambda v: f"{v:.3f}"))
+
+
+if __name__ == '__main__':
+    main()
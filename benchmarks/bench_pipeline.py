@@ -0,0 +1,171 @@
+"""
+Benchmark de todo el pipeline sobre datos sintéticos (`synthetic_data.py`).
+
+Para cada tamaño genera un dataset con el esquema del consolidado y mide, en un directorio
+temporal, cada etapa:
+  - preparacion: limpieza por lotes desde Parquet (`prepare_data_chunked`);
+  - preparacion_xlsx: lectura y limpieza del XLSX (`prepare_data`), solo hasta --max-filas-xlsx;
+  - eda, codificacion y modelado (SMOTE + Regresión Logística);
+  - dashboard_carga: carga de columnas y construcción del cubo de conteos;
+  - dashboard_callback: tiempo medio de `build_figures` para selecciones aleatorias.
+
+Con --guardar-baseline los tiempos se guardan en benchmarks/baseline.json; en las demás
+ejecuciones se comparan con ese archivo y una etapa más lenta que la base por encima de
+--tolerancia (y por más de --min-diferencia segundos) se marca como regresión (código de
+salida 1). La base depende de la máquina.
+
+Uso:
+    python benchmarks/bench_pipeline.py --tamanos 10000 100000 1000000
+    python benchmarks/bench_pipeline.py --tamanos 10000 100000 --guardar-baseline
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import numpy as np  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dashboard_cube  # noqa: E402
+import data_preparation  # noqa: E402
+import eda_and_modeling_prep  # noqa: E402
+import modeling  # noqa: E402
+from app_dashboard import build_figures, load_dashboard_data  # noqa: E402
+from synthetic_data import XLSX_MAX_ROWS, write_synthetic_data  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def timed(func, repeats, setup=None):
+    """Mejor tiempo de `repeats` ejecuciones; la salida estándar de la etapa se descarta."""
+    best = float('inf')
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _clear_plot_hashes():
+    # Sin las huellas, el EDA vuelve a dibujar todos los gráficos
+    if os.path.exists(eda_and_modeling_prep.plot_hashes_path):
+        os.remove(eda_and_modeling_prep.plot_hashes_path)
+
+
+def bench_dashboard_callback(selections=20, seed=0):
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = load_dashboard_data()
+    count_cube, localidades = dashboard_cube.build_count_cube(
+        df['nombre_localidad'], df['gravedad_binaria'], df['dia_semana'], df['hora_del_dia'], df.get('conteo'))
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    for _ in range(selections):
+        selected = list(rng.choice(localidades, size=rng.integers(1, len(localidades) + 1), replace=False))
+        build_figures(count_cube, localidades, selected, [0, 1] if rng.random() < 0.5 else [1])
+    return (time.perf_counter() - start) / selections
+
+
+def bench_size(rows, repeats, max_xlsx_rows):
+    """Tiempos por etapa (segundos) para un dataset sintético de `rows` filas."""
+    results = {}
+    workdir = tempfile.mkdtemp(prefix=f"bench_{rows}_")
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    try:
+        write_synthetic_data('fuente.parquet', rows)
+        results['preparacion'] = timed(lambda: data_preparation.prepare_data_chunked('fuente.parquet'), repeats)
+
+        if rows <= min(max_xlsx_rows, XLSX_MAX_ROWS):
+            write_synthetic_data('fuente.xlsx', rows)
+            results['preparacion_xlsx'] = timed(
+                lambda: data_preparation.prepare_data('fuente.xlsx', use_cache=False), repeats)
+
+        results['eda'] = timed(eda_and_modeling_prep.run_eda, repeats, setup=_clear_plot_hashes)
+        results['codificacion'] = timed(eda_and_modeling_prep.run_feature_encoding, repeats)
+        results['modelado'] = timed(modeling.run_modeling, repeats)
+        results['dashboard_carga'] = timed(load_dashboard_data, repeats)
+        results['dashboard_callback'] = min(bench_dashboard_callback() for _ in range(repeats))
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline, tolerance, min_delta=0.05):
+    """
+    Lista de (tamaño, etapa, actual, base) para las etapas más lentas que la base + tolerancia.
+    Diferencias menores a `min_delta` segundos se consideran ruido de medición.
+    """
+    regressions = []
+    for rows, stages in results.items():
+        for stage, seconds in stages.items():
+            base = baseline.get(rows, {}).get(stage)
+            if base is not None and seconds > base * (1 + tolerance) and seconds - base > min_delta:
+                regressions.append((rows, stage, seconds, base))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--repeticiones', type=int, default=1)
+    parser.add_argument('--max-filas-xlsx', type=int, default=100_000,
+                        help="Tamaño máximo para medir la lectura del XLSX (lenta por naturaleza).")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--guardar-baseline', action='store_true', help="Guardar estos tiempos como base.")
+    parser.add_argument('--tolerancia', type=float, default=0.25, help="Fracción de lentitud tolerada frente a la base.")
+    parser.add_argument('--min-diferencia', type=float, default=0.05,
+                        help="Diferencia mínima en segundos para considerar una regresión.")
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    results = {}
+    for rows in args.tamanos:
+        print(f"Midiendo {rows} filas...")
+        results[str(rows)] = bench_size(rows, args.repeticiones, args.max_filas_xlsx)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(f"\n{'Filas':>10} {'Etapa':<20} {'Tiempo (s)':>11} {'Base (s)':>10} {'Cambio':>8}")
+    for rows, stages in results.items():
+        for stage, seconds in stages.items():
+            base = baseline.get(rows, {}).get(stage)
+            change = f"{seconds / base - 1:+.0%}" if base else "-"
+            base_text = f"{base:.3f}" if base else "-"
+            print(f"{rows:>10} {stage:<20} {seconds:>11.3f} {base_text:>10} {change:>8}")
+
+    if args.guardar_baseline:
+        for rows, stages in results.items():
+            baseline.setdefault(rows, {}).update(stages)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\nBase guardada en {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.tolerancia, args.min_diferencia)
+    if regressions:
+        print(f"\nRegresiones (más de {args.tolerancia:.0%} sobre la base):")
+        for rows, stage, seconds, base in regressions:
+            print(f"  - {stage} con {rows} filas: {seconds:.3f} s (base {base:.3f} s)")
+        sys.exit(1)
+    elif baseline:
+        print("\nSin regresiones frente a la base.")
+
+
+if __name__ == '__main__':
+    main()
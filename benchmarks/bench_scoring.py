@@ -0,0 +1,107 @@
+"""
+Benchmark del servicio de puntaje (`scoring.py`).
+
+Entrena un modelo pequeño sobre datos sintéticos (o usa el artefacto más reciente con
+--usar-artefacto) y mide:
+  - puntaje por lotes: registros por segundo con `RiskScorer.score_frame` por bloques;
+  - puntaje en línea: latencia p50/p99 y solicitudes por segundo contra el endpoint HTTP local.
+
+Uso:
+    python benchmarks/bench_scoring.py --filas 1000000 --solicitudes 2000
+"""
+import argparse
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_store import DIAS_SEMANA  # noqa: E402
+from feature_encoding import FEATURES, encode, feature_names, fit_encoder  # noqa: E402
+from model_artifact import load_model_artifact  # noqa: E402
+from scoring import RiskScorer, make_server  # noqa: E402
+
+
+def synthetic_features(rows, seed=42):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'dia_semana': pd.Categorical.from_codes(rng.integers(0, 7, rows), categories=DIAS_SEMANA, ordered=True),
+        'hora_del_dia': rng.integers(0, 24, rows),
+        'codigo_localidad': rng.integers(1, 21, rows),
+        'clase': rng.choice(['Choque', 'Atropello', 'Volcamiento', 'Caida Ocupante', 'Otro'], rows),
+        'diseno_lugar': rng.choice(['Tramo de Via', 'Interseccion', 'Glorieta', 'Puente'], rows),
+    })
+
+
+def synthetic_artifact(rows=50_000):
+    df = synthetic_features(rows, seed=0)
+    y = np.random.default_rng(0).integers(0, 2, rows)
+    encoder = fit_encoder(df)
+    model = LogisticRegression(solver='liblinear').fit(encode(df, encoder), y)
+    return {'version': 0, 'encoder': encoder, 'model': model, 'feature_names': feature_names(encoder),
+            'features': FEATURES, 'metrics': {}}
+
+
+def bench_batch(scorer, rows, chunksize):
+    df = synthetic_features(rows)
+    start = time.perf_counter()
+    for offset in range(0, rows, chunksize):
+        scorer.score_frame(df.iloc[offset:offset + chunksize])
+    elapsed = time.perf_counter() - start
+    print(f"Lotes: {rows} registros en {elapsed:.2f} s -> {rows / elapsed:,.0f} registros/s (bloques de {chunksize})")
+
+
+def bench_online(scorer, requests):
+    records = synthetic_features(requests, seed=7).astype({'dia_semana': str}).to_dict('records')
+    records = [{k: (v.item() if hasattr(v, 'item') else v) for k, v in r.items()} for r in records]
+
+    # La codificación directa por registro debe coincidir con la vectorizada
+    np.testing.assert_allclose(scorer.score_records(records[:200]),
+                               scorer.score_frame(pd.DataFrame.from_records(records[:200])), rtol=1e-5)
+
+    server = make_server(scorer, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1])
+    latencies = []
+    try:
+        start = time.perf_counter()
+        for record in records:
+            t0 = time.perf_counter()
+            connection.request('POST', '/score', body=json.dumps(record).encode('utf-8'), headers={'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - start
+    finally:
+        connection.close()
+        server.shutdown()
+
+    latencies_ms = np.array(latencies) * 1000
+    print(f"En línea (HTTP, 1 registro por solicitud, conexión keep-alive): {requests} solicitudes")
+    print(f"  p50: {np.percentile(latencies_ms, 50):.2f} ms   p99: {np.percentile(latencies_ms, 99):.2f} ms   "
+          f"throughput: {requests / elapsed:,.0f} solicitudes/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, default=1_000_000)
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--solicitudes', type=int, default=2000)
+    parser.add_argument('--usar-artefacto', action='store_true', help="Usar el artefacto más reciente de models/.")
+    args = parser.parse_args()
+
+    scorer = RiskScorer(load_model_artifact() if args.usar_artefacto else synthetic_artifact())
+    bench_batch(scorer, args.filas, args.chunksize)
+    bench_online(scorer, args.solicitudes)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+# --- Cubo de Conteos para el Dashboard ---
+# Los únicos filtros del dashboard son localidad y gravedad, y todos los gráficos son
+# conteos por (día, hora), por gravedad o por localidad. Por eso basta con precalcular
+# un arreglo denso localidad × gravedad × día × hora y responder cada callback
+# sumando una rebanada del cubo, sin recorrer las filas de siniestros.
+
+N_DIAS = 7
+N_HORAS = 24
+# Posición adicional para registros sin día u hora válidos: no aparecen en el mapa de
+# calor pero sí cuentan en los totales por gravedad y por localidad
+MISSING_DIA = N_DIAS
+MISSING_HORA = N_HORAS
+
+
+def build_count_cube(nombre_localidad, gravedad_binaria, dia_semana, hora_del_dia, weights=None):
+    """
+    Construye el cubo de conteos con forma (localidades, 2, 8, 25).
+
+    Cada fila cuenta una vez, o `weights` veces si las filas ya son conteos agrupados.
+    Devuelve el cubo y el arreglo ordenado de nombres de localidad de su primer eje.
+    """
+    loc_codes, localidades = pd.factorize(nombre_localidad, sort=True)
+    gravedad = gravedad_binaria.to_numpy(dtype=np.int64)
+    dia = dia_semana.cat.codes.to_numpy(dtype=np.int64)
+    dia[dia < 0] = MISSING_DIA
+    hora = hora_del_dia.fillna(MISSING_HORA).to_numpy(dtype=np.int64)
+
+    shape = (len(localidades), 2, N_DIAS + 1, N_HORAS + 1)
+    flat_index = np.ravel_multi_index((loc_codes, gravedad, dia, hora), shape)
+    weights = None if weights is None else np.asarray(weights, dtype=np.float64)
+    cube = np.bincount(flat_index, weights=weights, minlength=int(np.prod(shape))).astype(np.int64).reshape(shape)
+    return cube, np.asarray(localidades)
+
+
+def slice_cube(cube, localidades, selected_localidades, selected_gravedad):
+    """Devuelve la parte del cubo que corresponde a la selección (ejes intactos, resto en cero)."""
+    loc_mask = np.isin(localidades, list(selected_localidades or []))
+    grav_mask = np.isin(np.arange(2), list(selected_gravedad or []))
+    return cube * (loc_mask[:, None, None, None] & grav_mask[None, :, None, None])
+
+
+def heatmap_counts(sub_cube):
+    """Matriz día × hora (7 × 24) de conteos."""
+    return sub_cube.sum(axis=(0, 1))[:N_DIAS, :N_HORAS]
+
+
+def gravedad_counts(sub_cube):
+    """Conteos por gravedad (índice 0: baja, 1: alta)."""
+    return sub_cube.sum(axis=(0, 2, 3))
+
+
+def localidad_counts(sub_cube):
+    """Conteos por localidad, en el orden del primer eje del cubo."""
+    return sub_cube.sum(axis=(1, 2, 3))
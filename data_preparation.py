@@ -1,76 +1,382 @@
-import pandas as pd
+import argparse
+import glob
+import json
 import os
+import sys
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pyarrow.parquet as pq
+
+from data_store import (CLEANED_DATA_PATH, DIAS_SEMANA, ChunkedTableWriter, file_sha256, load_table,
+                        save_table)
+from instrumentation import span
+from spatial_index import build_hex_counts, combine_hex_counts, hex_index_path, save_hex_index
+from streaming_stats import MetadataAccumulator
+from time_rollup import build_time_rollup, combine_time_rollups, save_time_rollup, time_rollup_path
 
 # --- Configuración ---
 # El archivo se descargó en el directorio Downloads
 file_path = os.path.expanduser("~/Downloads/siniestros_viales_consolidados_bogota_dc.xlsx")
-cleaned_data_path = "siniestros_viales_limpios.csv"
+cleaned_data_path = CLEANED_DATA_PATH
 metadata_path = "data_metadata.txt"
+# Formato de 'fecha' + 'hora' en el consolidado; otros formatos se infieren fila a fila
+datetime_format = "%Y-%m-%d %H:%M:%S"
+# Caché de la hoja ya parseada (snapshot Parquet identificado por el hash del archivo fuente)
+cache_dir = ".cache_ingesta"
+manifest_path = os.path.join(cache_dir, "manifest.json")
+# Procesamiento por lotes: límite de memoria por defecto y filas de la primera muestra
+default_memory_limit_mb = 512
+probe_rows = 1000
+# Copias y columnas derivadas hacen que un lote ocupe varias veces su tamaño de lectura
+memory_factor = 4
+
+
+# --- 1. Recolección de Datos (Lectura con caché) ---
+
+def read_source(path, use_cache=True):
+    """
+    Lee la primera hoja del archivo fuente.
+
+    El resultado del parseo se guarda como snapshot Parquet con el hash SHA-256 del
+    archivo en el nombre; si el archivo no cambió se lee el snapshot en lugar del XLSX.
+    Devuelve el DataFrame y el hash del archivo fuente.
+    """
+    source_hash = file_sha256(path)
+    snapshot_path = os.path.join(cache_dir, f"fuente_{source_hash[:16]}.parquet")
 
-# --- 1. Recolección de Datos (Lectura) ---
-print(f"Leyendo el archivo: {file_path}...")
-try:
-    # Leer la primera hoja del archivo XLSX
-    df = pd.read_excel(file_path, engine='openpyxl')
+    if use_cache and os.path.exists(snapshot_path):
+        print(f"El archivo no cambió desde la última lectura; usando la caché {snapshot_path}.")
+        return load_table(snapshot_path), source_hash
+
+    print(f"Leyendo el archivo: {path}...")
+    df = pd.read_excel(path, engine='openpyxl')
     print("Lectura exitosa.")
-except Exception as e:
-    print(f"Error al leer el archivo: {e}")
-    exit()
+
+    if use_cache:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Solo se conserva el snapshot de la versión más reciente del archivo
+        for old_snapshot in glob.glob(os.path.join(cache_dir, "fuente_*.parquet")):
+            os.remove(old_snapshot)
+        save_table(df, snapshot_path)
+    return df, source_hash
+
+
+def load_manifest():
+    """Devuelve el estado de la última ingesta (hash de la fuente, marca de agua y filas)."""
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def save_manifest(source_hash, watermark, rows):
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = {
+        'source_hash': source_hash,
+        'watermark': None if pd.isna(watermark) else str(watermark),
+        'rows': rows,
+    }
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
 
 # --- 2. Inspección Inicial y Documentación ---
-print("\nRealizando inspección inicial...")
 
-# Guardar la información del DataFrame en un archivo de metadatos
-with open(metadata_path, "w") as f:
-    f.write("--- Información General del DataFrame ---\n")
-    df.info(buf=f)
-    f.write("\n\n--- Primeras 5 Filas ---\n")
-    f.write(df.head().to_string())
-    f.write("\n\n--- Conteo de Valores Nulos ---\n")
-    f.write(df.isnull().sum().to_string())
-    f.write("\n\n--- Conteo de Valores Únicos ---\n")
-    f.write(df.nunique().to_string())
+def write_metadata(df, path):
+    """Guarda la información del DataFrame en un archivo de metadatos."""
+    with open(path, "w") as f:
+        f.write("--- Información General del DataFrame ---\n")
+        df.info(buf=f)
+        f.write("\n\n--- Primeras 5 Filas ---\n")
+        f.write(df.head().to_string())
+        f.write("\n\n--- Conteo de Valores Nulos ---\n")
+        f.write(df.isnull().sum().to_string())
+        f.write("\n\n--- Conteo de Valores Únicos ---\n")
+        f.write(df.nunique().to_string())
 
-print(f"Metadatos iniciales guardados en: {metadata_path}")
 
 # --- 3. Limpieza y Transformación (Preparación para el EDA) ---
 
-# Convertir nombres de columnas a minúsculas y reemplazar caracteres especiales
-df.columns = df.columns.str.lower().str.replace(' ', '_', regex=False).str.replace('á', 'a').str.replace('é', 'e').str.replace('í', 'i').str.replace('ó', 'o').str.replace('ú', 'u').str.replace('.', '', regex=False).str.replace('(', '', regex=False).str.replace(')', '', regex=False).str.replace('-', '_', regex=False).str.replace('/', '_', regex=False)
+def normalize_columns(df):
+    """Convierte nombres de columnas a minúsculas y reemplaza caracteres especiales."""
+    df.columns = df.columns.str.lower().str.replace(' ', '_', regex=False).str.replace('á', 'a').str.replace('é', 'e').str.replace('í', 'i').str.replace('ó', 'o').str.replace('ú', 'u').str.replace('.', '', regex=False).str.replace('(', '', regex=False).str.replace(')', '', regex=False).str.replace('-', '_', regex=False).str.replace('/', '_', regex=False)
+    return df
+
+
+def parse_fecha_hora(df):
+    """
+    Combina las columnas 'fecha' y 'hora' en un datetime con formato explícito.
+
+    Con `datetime_format` pandas parsea sin inferir el formato fila a fila; solo las filas
+    que no lo cumplen pasan por la inferencia (más lenta).
+    """
+    # 'hora' llega como texto 'HH:MM:SS' o como objetos datetime.time desde el Excel
+    hora = df['hora'].astype(str)
+    if pd.api.types.is_datetime64_any_dtype(df['fecha']):
+        return df['fecha'].dt.normalize() + pd.to_timedelta(hora, errors='coerce')
+
+    texto = df['fecha'] + ' ' + hora
+    fecha_hora = pd.to_datetime(texto, format=datetime_format, errors='coerce')
+    retry = fecha_hora.isna() & df['fecha'].notna()
+    if retry.any():
+        fecha_hora[retry] = pd.to_datetime(texto[retry], format='mixed', errors='coerce')
+    return fecha_hora
+
+
+def derive_features(df):
+    """
+    Crea las variables temporales y la variable objetivo a partir de 'fecha', 'hora' y 'gravedad'.
+
+    Todas las operaciones son vectorizadas y producen tipos compactos: datetime64/timedelta64
+    en lugar de objetos `date`/`time`, categorías para el día y enteros pequeños para el resto.
+    """
+    # Las columnas son 'fecha' y 'hora' (en minúsculas por el pre-procesamiento anterior)
+    if 'fecha' not in df.columns or 'hora' not in df.columns:
+        return df
+
+    if 'fecha_hora_accidente' not in df.columns:
+        df['fecha_hora_accidente'] = parse_fecha_hora(df)
+    fecha_hora = df['fecha_hora_accidente']
+    df['fecha_accidente'] = fecha_hora.dt.normalize()
+    # Hora como tiempo transcurrido desde la medianoche
+    df['hora_accidente'] = fecha_hora - df['fecha_accidente']
 
-# Convertir la columna de fecha/hora
-# Las columnas son 'fecha' y 'hora' (en minúsculas por el pre-procesamiento anterior)
-if 'fecha' in df.columns and 'hora' in df.columns:
-    # Combinar las columnas 'fecha' y 'hora' y convertirlas a datetime
-    df['fecha_hora_accidente'] = pd.to_datetime(df['fecha'] + ' ' + df['hora'].astype(str), errors='coerce')
-    df['fecha_accidente'] = df['fecha_hora_accidente'].dt.date
-    df['hora_accidente'] = df['fecha_hora_accidente'].dt.time
     # Creación de variables temporales clave para el modelo predictivo
-    # Calcular el día de la semana (0=Lunes, 6=Domingo) y mapear a español
-    dias_semana = {
-        0: 'Lunes', 1: 'Martes', 2: 'Miércoles', 3: 'Jueves', 
-        4: 'Viernes', 5: 'Sábado', 6: 'Domingo'
-    }
-    df['dia_semana'] = df['fecha_hora_accidente'].dt.dayofweek.map(dias_semana)
-    df['mes'] = df['fecha_hora_accidente'].dt.month
-    df['anio'] = df['fecha_hora_accidente'].dt.year
-    df['hora_del_dia'] = df['fecha_hora_accidente'].dt.hour
-    
+    # El día de la semana (0=Lunes, 6=Domingo) es directamente el código de la categoría;
+    # las fechas inválidas quedan con código -1 (nulo)
+    dia_codes = fecha_hora.dt.dayofweek.fillna(-1).to_numpy(dtype=np.int8)
+    df['dia_semana'] = pd.Categorical.from_codes(dia_codes, dtype=pd.CategoricalDtype(DIAS_SEMANA, ordered=True))
+    df['mes'] = fecha_hora.dt.month.astype('Int8')
+    df['anio'] = fecha_hora.dt.year.astype('Int16')
+    df['hora_del_dia'] = fecha_hora.dt.hour.astype('Int8')
+
     # --- Definición de la Variable Objetivo ---
     # La columna 'gravedad' tiene 3 valores únicos (45: GRAVEDAD 3). Asumiremos:
     # 1: Solo Daños (Leve)
     # 2: Lesionado (Grave)
     # 3: Muerto (Grave)
     # Variable objetivo: 1 = Grave (Muerto o Lesionado), 0 = Leve (Solo Daños)
-    df['gravedad_binaria'] = df['gravedad'].apply(lambda x: 1 if x in [2, 3] else 0)
-
-    print(f"Variable objetivo 'gravedad_binaria' creada. Distribución: \n{df['gravedad_binaria'].value_counts()}")
-    
-# Guardar el DataFrame pre-procesado a CSV
-print("\nGuardando el DataFrame pre-procesado a CSV...")
-df.to_csv(cleaned_data_path, index=False)
-print(f"DataFrame guardado en: {cleaned_data_path}")
-
-# Imprimir un resumen de las columnas para el siguiente paso
-print("\nColumnas del DataFrame después de la limpieza:")
-print(df.columns.tolist())
+    df['gravedad_binaria'] = np.isin(df['gravedad'].to_numpy(), [2, 3]).astype(np.int8)
+    return df
+
+
+def has_coordinates(df):
+    return {'latitud', 'longitud', 'hora_del_dia', 'gravedad_binaria'}.issubset(df.columns)
+
+
+def has_time_series(df):
+    return {'fecha_hora_accidente', 'codigo_localidad', 'gravedad_binaria'}.issubset(df.columns)
+
+
+# --- 4. Ejecución de la Preparación ---
+
+def prepare_data(source_path=file_path, output_path=cleaned_data_path, append=False, use_cache=True):
+    """
+    Ejecuta la lectura, documentación, limpieza y guardado del dataset.
+
+    En modo `append` solo se limpian las filas con 'fecha_hora_accidente' posterior a la
+    última ingerida y se agregan al dataset limpio existente.
+    """
+    manifest = load_manifest()
+    if append and os.path.exists(output_path) and os.path.exists(source_path) \
+            and manifest.get('source_hash') == file_sha256(source_path):
+        print("El archivo fuente no cambió desde la última ingesta; no hay filas nuevas.")
+        return load_table(output_path)
+
+    with span('preparacion.lectura') as sp:
+        df, source_hash = read_source(source_path, use_cache=use_cache)
+        sp.rows = len(df)
+
+    print("\nRealizando inspección inicial...")
+    write_metadata(df, metadata_path)
+    print(f"Metadatos iniciales guardados en: {metadata_path}")
+
+    with span('preparacion.limpieza') as sp:
+        df = normalize_columns(df)
+
+        existing = None
+        if append and os.path.exists(output_path):
+            existing = load_table(output_path)
+            watermark = existing['fecha_hora_accidente'].max()
+            # Solo se combinan fecha y hora para filtrar; el resto de la limpieza se aplica a las filas nuevas
+            fecha_hora = parse_fecha_hora(df)
+            new_rows = (fecha_hora > watermark).to_numpy()
+            df = df[new_rows].copy()
+            df['fecha_hora_accidente'] = fecha_hora[new_rows]
+            print(f"Modo incremental: {len(df)} filas posteriores a {watermark}.")
+
+        df = derive_features(df)
+        sp.rows = len(df)
+    if 'gravedad_binaria' in df.columns:
+        print(f"Variable objetivo 'gravedad_binaria' creada. Distribución: \n{df['gravedad_binaria'].value_counts()}")
+
+    if existing is not None:
+        df = pd.concat([existing, df[existing.columns]], ignore_index=True)
+
+    # Guardar el DataFrame pre-procesado en formato columnar (Parquet)
+    # Se conservan los tipos datetime y category, evitando re-parsear texto en las etapas siguientes
+    print("\nGuardando el DataFrame pre-procesado en Parquet...")
+    with span('preparacion.escritura', rows=len(df)):
+        save_table(df, output_path)
+    watermark = df['fecha_hora_accidente'].max() if 'fecha_hora_accidente' in df.columns else None
+    save_manifest(source_hash, watermark, len(df))
+    print(f"DataFrame guardado en: {output_path}")
+
+    if has_coordinates(df):
+        hex_path = hex_index_path(output_path)
+        with span('preparacion.indice_espacial', rows=len(df)):
+            save_hex_index(build_hex_counts(df['latitud'], df['longitud'], df['hora_del_dia'], df['gravedad_binaria']),
+                           hex_path)
+        print(f"Índice espacial hexagonal guardado en: {hex_path}")
+
+    if has_time_series(df):
+        rollup_path = time_rollup_path(output_path)
+        with span('preparacion.serie_temporal', rows=len(df)):
+            save_time_rollup(build_time_rollup(df['fecha_hora_accidente'], df['codigo_localidad'],
+                                               df['gravedad_binaria']), rollup_path)
+        print(f"Serie temporal multirresolución guardada en: {rollup_path}")
+
+    # Imprimir un resumen de las columnas para el siguiente paso
+    print("\nColumnas del DataFrame después de la limpieza:")
+    print(df.columns.tolist())
+    return df
+
+
+# --- 5. Procesamiento por Lotes (datasets más grandes que la memoria) ---
+
+def rows_per_chunk(sample, memory_limit_mb):
+    """Calcula cuántas filas caben en un lote a partir del tamaño por fila de una muestra."""
+    bytes_per_row = max(sample.memory_usage(deep=True, index=False).sum() / max(len(sample), 1), 1)
+    return max(probe_rows, int(memory_limit_mb * 2**20 / (bytes_per_row * memory_factor)))
+
+
+def _iter_excel_rows(path):
+    """Recorre la primera hoja fila a fila (la primera fila es el encabezado)."""
+    # openpyxl en modo read_only no carga el libro completo en memoria
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            if any(value is not None for value in row):
+                yield row
+    finally:
+        workbook.close()
+
+
+def iter_source_chunks(path, memory_limit_mb=default_memory_limit_mb):
+    """
+    Recorre el archivo fuente (XLSX, CSV o Parquet) en lotes acotados por `memory_limit_mb`.
+
+    El primer lote es una muestra de `probe_rows` filas que sirve para estimar el tamaño
+    de los lotes siguientes.
+    """
+    if path.endswith('.parquet'):
+        parquet_file = pq.ParquetFile(path)
+        sample = parquet_file.read_row_group(0).slice(0, probe_rows).to_pandas()
+        for batch in parquet_file.iter_batches(batch_size=rows_per_chunk(sample, memory_limit_mb)):
+            yield batch.to_pandas()
+        return
+
+    if path.endswith('.csv'):
+        reader = pd.read_csv(path, iterator=True)
+        chunk = reader.get_chunk(probe_rows)
+        size = rows_per_chunk(chunk, memory_limit_mb)
+        while True:
+            yield chunk
+            try:
+                chunk = reader.get_chunk(size)
+            except StopIteration:
+                return
+
+    rows = _iter_excel_rows(path)
+    header = list(next(rows))
+    size = probe_rows
+    while True:
+        batch = [row for _, row in zip(range(size), rows)]
+        if not batch:
+            return
+        chunk = pd.DataFrame(batch, columns=header)
+        if size == probe_rows:
+            size = rows_per_chunk(chunk, memory_limit_mb)
+        yield chunk
+
+
+def prepare_data_chunked(source_path=file_path, output_path=cleaned_data_path,
+                         memory_limit_mb=default_memory_limit_mb):
+    """
+    Variante por lotes de `prepare_data`: cada lote se normaliza, se le derivan las variables
+    temporales y `gravedad_binaria`, y se escribe al Parquet de salida. El reporte de
+    metadatos se acumula de forma incremental (nulos exactos, únicos aproximados).
+    """
+    print(f"Procesando {source_path} por lotes (límite de memoria: {memory_limit_mb} MB)...")
+    metadata = MetadataAccumulator()
+    target_counts = pd.Series(dtype='int64')
+    watermark = pd.NaT
+    hex_counts = []
+    time_counts = []
+
+    with span('preparacion.lotes') as sp, ChunkedTableWriter(output_path) as writer:
+        for i, chunk in enumerate(iter_source_chunks(source_path, memory_limit_mb)):
+            metadata.update(chunk)
+            chunk = derive_features(normalize_columns(chunk))
+            if 'gravedad_binaria' in chunk.columns:
+                target_counts = target_counts.add(chunk['gravedad_binaria'].value_counts(), fill_value=0)
+            if 'fecha_hora_accidente' in chunk.columns:
+                watermark = max(watermark, chunk['fecha_hora_accidente'].max()) if pd.notna(watermark) \
+                    else chunk['fecha_hora_accidente'].max()
+            if has_coordinates(chunk):
+                hex_counts.append(build_hex_counts(chunk['latitud'], chunk['longitud'],
+                                                   chunk['hora_del_dia'], chunk['gravedad_binaria']))
+            if has_time_series(chunk):
+                time_counts.append(build_time_rollup(chunk['fecha_hora_accidente'], chunk['codigo_localidad'],
+                                                     chunk['gravedad_binaria']))
+            writer.write(chunk)
+            print(f"  Lote {i + 1}: {len(chunk)} filas ({writer.rows} acumuladas).")
+            sp.rows = writer.rows
+
+    metadata.write(metadata_path)
+    print(f"Metadatos guardados en: {metadata_path}")
+    if not target_counts.empty:
+        print(f"Variable objetivo 'gravedad_binaria' creada. Distribución: \n{target_counts.astype(int)}")
+    save_manifest(file_sha256(source_path), watermark, writer.rows)
+    print(f"DataFrame guardado en: {output_path}")
+    if hex_counts:
+        hex_path = hex_index_path(output_path)
+        save_hex_index(combine_hex_counts(hex_counts), hex_path)
+        print(f"Índice espacial hexagonal guardado en: {hex_path}")
+    if time_counts:
+        rollup_path = time_rollup_path(output_path)
+        save_time_rollup(combine_time_rollups(time_counts), rollup_path)
+        print(f"Serie temporal multirresolución guardada en: {rollup_path}")
+
+    print("\nColumnas del DataFrame después de la limpieza:")
+    print(writer.schema.names)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Limpieza y transformación del dataset de siniestros viales.")
+    parser.add_argument('--input', default=file_path, help="Archivo XLSX fuente.")
+    parser.add_argument('--output', default=cleaned_data_path, help="Archivo Parquet de salida.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--append', action='store_true',
+                        help="Agregar solo las filas posteriores a la última 'fecha_hora_accidente' ingerida.")
+    mode.add_argument('--chunked', action='store_true',
+                      help="Procesar la fuente por lotes, sin cargarla completa en memoria.")
+    parser.add_argument('--no-cache', action='store_true', help="Ignorar la caché de la hoja parseada.")
+    parser.add_argument('--memoria-max-mb', type=int, default=default_memory_limit_mb,
+                        help="Límite aproximado de memoria por lote en modo --chunked.")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.chunked:
+            prepare_data_chunked(args.input, args.output, memory_limit_mb=args.memoria_max_mb)
+        else:
+            prepare_data(args.input, args.output, append=args.append, use_cache=not args.no_cache)
+    except Exception as e:
+        print(f"Error al preparar los datos: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import hashlib
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+# --- Configuración ---
+# Almacenamiento intermedio columnar entre etapas del pipeline.
+# Parquet/Feather conservan los tipos (datetime, category, enteros), por lo que
+# las etapas siguientes no tienen que volver a parsear texto ni inferir tipos.
+CLEANED_DATA_PATH = "siniestros_viales_limpios.parquet"
+CLEANED_DATA_CSV_PATH = "siniestros_viales_limpios.csv"
+MODELING_DATA_PATH = "siniestros_viales_modelado.parquet"
+MODELING_DATA_CSV_PATH = "siniestros_viales_modelado.csv"
+
+DIAS_SEMANA = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+
+# Tipos a restaurar cuando solo existe el CSV heredado
+_DATETIME_COLUMNS = ['fecha_hora_accidente', 'fecha_accidente']
+_CATEGORICAL_COLUMNS = {'dia_semana': pd.CategoricalDtype(DIAS_SEMANA, ordered=True)}
+
+
+def file_sha256(path, block_size=1 << 20):
+    """Calcula el hash SHA-256 del contenido de un archivo leyéndolo por bloques."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _coerce_mixed_objects(df):
+    """Convierte a texto las columnas object con tipos mezclados (Arrow no las admite)."""
+    for col in df.columns[df.dtypes == object]:
+        if pd.api.types.infer_dtype(df[col], skipna=True).startswith('mixed'):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def _restore_dtypes(df):
+    """Aplica a un DataFrame leído de CSV los tipos que el formato columnar conserva."""
+    for col in _DATETIME_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    for col, dtype in _CATEGORICAL_COLUMNS.items():
+        if col in df.columns:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def save_table(df, path):
+    """Guarda un DataFrame en formato columnar (Parquet o Feather según la extensión)."""
+    df = _coerce_mixed_objects(df.copy())
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if path.endswith(('.feather', '.arrow')):
+        # Feather sin compresión permite lectura con memory-map
+        feather.write_feather(table, path, compression='uncompressed')
+    else:
+        pq.write_table(table, path, compression='snappy')
+
+
+def load_table(path, columns=None, csv_fallback=None, memory_map=False):
+    """
+    Carga una tabla leyendo solo las columnas indicadas (proyección de columnas).
+
+    Con `memory_map=True` el archivo se mapea en memoria en lugar de copiarse a un
+    buffer; con Feather sin compresión las páginas se comparten entre procesos.
+    Si el archivo columnar no existe pero sí el CSV heredado (`csv_fallback`),
+    se lee el CSV y se restauran los tipos de fecha y categóricos.
+    """
+    if os.path.exists(path):
+        if path.endswith(('.feather', '.arrow')):
+            return feather.read_table(path, columns=columns, memory_map=memory_map).to_pandas()
+        return pq.read_table(path, columns=columns, memory_map=memory_map).to_pandas()
+
+    if csv_fallback and os.path.exists(csv_fallback):
+        print(f"Aviso: no se encontró {path}; usando el CSV heredado {csv_fallback}.")
+        return _restore_dtypes(pd.read_csv(csv_fallback, usecols=columns))
+
+    raise FileNotFoundError(f"No se encontró {path}" + (f" ni {csv_fallback}" if csv_fallback else ""))
+
+
+class ChunkedTableWriter:
+    """
+    Escribe un archivo Parquet lote a lote sin mantener el dataset completo en memoria.
+
+    El esquema se fija con el primer lote; los lotes siguientes se convierten a ese
+    esquema (p. ej. una columna de texto que en un lote solo trae números).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.schema = None
+        self.rows = 0
+        self._writer = None
+
+    def write(self, df):
+        df = _coerce_mixed_objects(df.copy())
+        if self._writer is None:
+            schema = pa.Schema.from_pandas(df, preserve_index=False)
+            # Una columna completamente nula en el primer lote se guarda como texto
+            fields = [f.with_type(pa.string()) if pa.types.is_null(f.type) else f for f in schema]
+            self.schema = pa.schema(fields, metadata=schema.metadata)
+            self._writer = pq.ParquetWriter(self.path, self.schema, compression='snappy')
+
+        for field in self.schema:
+            col = df[field.name]
+            if (pa.types.is_string(field.type) or pa.types.is_large_string(field.type)) \
+                    and not pd.api.types.is_string_dtype(col):
+                df[field.name] = col.where(col.isna(), col.astype(str)).astype(object)
+
+        self._writer.write_table(pa.Table.from_pandas(df, schema=self.schema, preserve_index=False))
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,121 +1,261 @@
-import pandas as pd
+import matplotlib
 import matplotlib.pyplot as plt
 import seaborn as sns
-import numpy as np
+import argparse
+import hashlib
+import inspect
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+from data_store import CLEANED_DATA_PATH, DIAS_SEMANA
+from feature_encoding import (ENCODER_PATH, FEATURE_MATRIX_PATH, FEATURES, TARGET, VOCABULARY_PATH, encode,
+                              feature_names, fit_encoder, save_encoder, save_feature_matrix)
+from instrumentation import span
+from query_backend import COUNT_COLUMNS, group_counts, load_columns, resolve_backend
 
 # --- Configuración ---
-cleaned_data_path = "siniestros_viales_limpios.csv"
+cleaned_data_path = CLEANED_DATA_PATH
 eda_report_path = "eda_report.md"
+modeling_prep_report_path = "modeling_prep_report.md"
 plots_dir = "plots"
-os.makedirs(plots_dir, exist_ok=True)
+# Huella del agregado de cada gráfico en la última ejecución
+plot_hashes_path = os.path.join(plots_dir, ".plot_hashes.json")
 
 # --- 1. Carga de Datos Limpios ---
-print(f"Cargando datos limpios desde: {cleaned_data_path}...")
-df = pd.read_csv(cleaned_data_path)
-
-# Convertir columnas de fecha/hora que se guardaron como strings
-df['fecha_hora_accidente'] = pd.to_datetime(df['fecha_hora_accidente'])
-df['fecha_accidente'] = pd.to_datetime(df['fecha_accidente'])
-df['hora_accidente'] = pd.to_datetime(df['hora_accidente']).dt.time
-
-# --- 2. Análisis Exploratorio de Datos (EDA) ---
-
-eda_content = "## Análisis Exploratorio de Datos (EDA)\n\n"
-eda_content += "### 2.1. Distribución de la Variable Objetivo (Gravedad)\n"
-eda_content += "La variable objetivo para el modelo predictivo es `gravedad_binaria` (1: Grave - Muerto/Lesionado, 0: Leve - Solo Daños).\n"
-
-# 2.1. Distribución de la Variable Objetivo
-gravedad_counts = df['gravedad_binaria'].value_counts(normalize=True) * 100
-eda_content += "La distribución de la gravedad muestra un problema de desbalance de clases:\n"
-eda_content += f"| Gravedad | Porcentaje |\n| :--- | :--- |\n| Grave (1) | {gravedad_counts.loc[1]:.2f}% |\n| Leve (0) | {gravedad_counts.loc[0]:.2f}% |\n"
-
-# 2.2. Análisis Temporal
-eda_content += "\n### 2.2. Análisis Temporal\n"
-
-# Siniestros por Día de la Semana
-plt.figure(figsize=(10, 6))
-order_dias = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
-sns.countplot(y='dia_semana', data=df, order=order_dias, palette="viridis")
-plt.title('Siniestros por Día de la Semana')
-plt.xlabel('Número de Siniestros')
-plt.ylabel('Día de la Semana')
-plt.savefig(os.path.join(plots_dir, 'siniestros_por_dia_semana.png'))
-plt.close()
-eda_content += "Se generó el gráfico 'siniestros_por_dia_semana.png' mostrando la distribución de siniestros por día de la semana.\n"
-
-# Siniestros por Hora del Día
-plt.figure(figsize=(12, 6))
-sns.countplot(x='hora_del_dia', data=df, palette="magma")
-plt.title('Siniestros por Hora del Día')
-plt.xlabel('Hora del Día (0-23)')
-plt.ylabel('Número de Siniestros')
-plt.savefig(os.path.join(plots_dir, 'siniestros_por_hora_dia.png'))
-plt.close()
-eda_content += "Se generó el gráfico 'siniestros_por_hora_dia.png' mostrando la distribución de siniestros por hora del día.\n"
-
-# 2.3. Análisis Geográfico (Localidad)
-eda_content += "\n### 2.3. Análisis Geográfico (Localidad)\n"
-
-# Siniestros por Localidad (usando codigo_localidad)
-plt.figure(figsize=(12, 8))
-localidad_counts = df['codigo_localidad'].value_counts().sort_values(ascending=False)
-sns.barplot(x=localidad_counts.index, y=localidad_counts.values, palette="rocket")
-plt.title('Siniestros por Código de Localidad')
-plt.xlabel('Código de Localidad')
-plt.ylabel('Número de Siniestros')
-plt.xticks(rotation=45, ha='right')
-plt.tight_layout()
-plt.savefig(os.path.join(plots_dir, 'siniestros_por_localidad.png'))
-plt.close()
-eda_content += "Se generó el gráfico 'siniestros_por_localidad.png' mostrando la distribución de siniestros por código de localidad.\n"
-
-# 2.4. Relación entre Variables y Gravedad
-eda_content += "\n### 2.4. Relación entre Variables y Gravedad\n"
-
-# Gravedad por Día de la Semana
-plt.figure(figsize=(10, 6))
-sns.countplot(y='dia_semana', hue='gravedad_binaria', data=df, order=order_dias, palette="coolwarm")
-plt.title('Gravedad de Siniestros por Día de la Semana')
-plt.xlabel('Número de Siniestros')
-plt.ylabel('Día de la Semana')
-plt.legend(title='Gravedad', labels=['Leve (0)', 'Grave (1)'])
-plt.savefig(os.path.join(plots_dir, 'gravedad_por_dia_semana.png'))
-plt.close()
-eda_content += "Se generó el gráfico 'gravedad_por_dia_semana.png' para comparar la gravedad por día de la semana.\n"
-
-# --- 3. Preparación Final para el Modelado ---
-
-# 3.1. Selección de Características (Features)
-# Variables predictoras (X):
-# - dia_semana, hora_del_dia, codigo_localidad, clase, diseno_lugar
-# Variable objetivo (y):
-# - gravedad_binaria
-
-features = ['dia_semana', 'hora_del_dia', 'codigo_localidad', 'clase', 'diseno_lugar']
-target = 'gravedad_binaria'
-
-# 3.2. Manejo de Variables Categóricas (One-Hot Encoding)
-df_model = df[features + [target]].copy()
-
-# Convertir variables categóricas a tipo 'category' para un manejo eficiente
-categorical_features = ['dia_semana', 'codigo_localidad', 'clase', 'diseno_lugar']
-for col in categorical_features:
-    df_model[col] = df_model[col].astype('category')
-
-# Aplicar One-Hot Encoding
-df_model = pd.get_dummies(df_model, columns=categorical_features, drop_first=True)
-
-# 3.3. Guardar el DataFrame listo para el modelado
-modeling_data_path = "siniestros_viales_modelado.csv"
-df_model.to_csv(modeling_data_path, index=False)
-eda_content += f"\n### 3. Preparación para el Modelado\n"
-eda_content += f"El DataFrame final para el modelado, con One-Hot Encoding aplicado, se guardó en: {modeling_data_path}\n"
-eda_content += f"El DataFrame tiene {df_model.shape[0]} filas y {df_model.shape[1]} columnas (incluyendo la variable objetivo)."
-
-# --- 4. Guardar Reporte EDA ---
-with open(eda_report_path, "w") as f:
-    f.write(eda_content)
-
-print(f"\nReporte EDA guardado en: {eda_report_path}")
-print(f"Datos listos para el modelado guardados en: {modeling_data_path}")
+
+def load_cleaned_data(columns, path=cleaned_data_path):
+    # Solo se leen las columnas que usa cada etapa (proyección de columnas).
+    # El formato columnar conserva los tipos, por lo que no hace falta volver a convertir fechas.
+    # Con PIPELINE_QUERY_BACKEND=duckdb la lectura la hace DuckDB (ver query_backend.py).
+    print(f"Cargando datos limpios desde: {path}...")
+    return load_columns(columns, path)
+
+
+# --- 2. Agregados del EDA (una sola pasada) ---
+
+def compute_eda_aggregates(counts):
+    """
+    Calcula los agregados que necesitan el reporte y los gráficos.
+
+    `counts` son los conteos por (día, hora, localidad, gravedad) de `query_backend.group_counts`,
+    obtenidos en una sola pasada; cada gráfico usa una marginal de esa tabla pequeña, en lugar
+    de volver a recorrer todas las filas.
+    """
+    dias = counts.groupby(level='dia_semana', observed=True).sum().reindex(DIAS_SEMANA, fill_value=0)
+    gravedad = counts.groupby(level='gravedad_binaria').sum()
+    return {
+        'gravedad_pct': gravedad / gravedad.sum() * 100,
+        'dia_semana': dias,
+        'hora_del_dia': counts.groupby(level='hora_del_dia').sum().sort_index(),
+        'localidad': counts.groupby(level='codigo_localidad').sum().sort_values(ascending=False),
+        'gravedad_por_dia': (counts.groupby(level=['dia_semana', 'gravedad_binaria'], observed=True).sum()
+                             .unstack(fill_value=0).reindex(DIAS_SEMANA, fill_value=0)),
+    }
+
+
+# --- 3. Gráficos a partir de los Agregados ---
+
+def plot_dia_semana(counts, path):
+    plt.figure(figsize=(10, 6))
+    sns.barplot(x=counts.values, y=counts.index.astype(str), hue=counts.index.astype(str), order=DIAS_SEMANA,
+                hue_order=DIAS_SEMANA, palette="viridis", legend=False, errorbar=None)
+    plt.title('Siniestros por Día de la Semana')
+    plt.xlabel('Número de Siniestros')
+    plt.ylabel('Día de la Semana')
+    plt.savefig(path)
+    plt.close()
+
+
+def plot_hora_dia(counts, path):
+    plt.figure(figsize=(12, 6))
+    sns.barplot(x=counts.index.astype(int), y=counts.values, hue=counts.index.astype(int), palette="magma",
+                legend=False, errorbar=None)
+    plt.title('Siniestros por Hora del Día')
+    plt.xlabel('Hora del Día (0-23)')
+    plt.ylabel('Número de Siniestros')
+    plt.savefig(path)
+    plt.close()
+
+
+def plot_localidad(counts, path):
+    plt.figure(figsize=(12, 8))
+    sns.barplot(x=counts.index.astype(str), y=counts.values, hue=counts.index.astype(str), palette="rocket",
+                legend=False, errorbar=None)
+    plt.title('Siniestros por Código de Localidad')
+    plt.xlabel('Código de Localidad')
+    plt.ylabel('Número de Siniestros')
+    plt.xticks(rotation=45, ha='right')
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+
+def plot_gravedad_por_dia(table, path):
+    long = table.stack().rename('n').reset_index()
+    long['gravedad_binaria'] = long['gravedad_binaria'].map({0: 'Leve (0)', 1: 'Grave (1)'})
+    plt.figure(figsize=(10, 6))
+    sns.barplot(x='n', y=long['dia_semana'].astype(str), hue='gravedad_binaria', data=long,
+                order=DIAS_SEMANA, hue_order=['Leve (0)', 'Grave (1)'], palette="coolwarm", errorbar=None)
+    plt.title('Gravedad de Siniestros por Día de la Semana')
+    plt.xlabel('Número de Siniestros')
+    plt.ylabel('Día de la Semana')
+    plt.legend(title='Gravedad')
+    plt.savefig(path)
+    plt.close()
+
+
+# Archivo -> (función de dibujo, agregado que usa)
+EDA_PLOTS = {
+    'siniestros_por_dia_semana.png': (plot_dia_semana, 'dia_semana'),
+    'siniestros_por_hora_dia.png': (plot_hora_dia, 'hora_del_dia'),
+    'siniestros_por_localidad.png': (plot_localidad, 'localidad'),
+    'gravedad_por_dia_semana.png': (plot_gravedad_por_dia, 'gravedad_por_dia'),
+}
+
+
+def aggregate_hash(plot_func, aggregate):
+    """Huella del agregado y del código que lo dibuja; si no cambia, el gráfico tampoco."""
+    digest = hashlib.sha256(inspect.getsource(plot_func).encode('utf-8'))
+    digest.update(aggregate.to_json(orient='split').encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _init_plot_worker():
+    # Backend sin pantalla: los procesos del pool solo escriben archivos PNG
+    matplotlib.use('Agg')
+
+
+def render_plots(aggregates, workers=None):
+    """
+    Dibuja los gráficos cuyo agregado cambió desde la última ejecución, en paralelo.
+    Devuelve la lista de archivos regenerados.
+    """
+    previous = {}
+    if os.path.exists(plot_hashes_path):
+        with open(plot_hashes_path) as f:
+            previous = json.load(f)
+
+    hashes, tasks = {}, []
+    for name, (plot_func, key) in EDA_PLOTS.items():
+        path = os.path.join(plots_dir, name)
+        hashes[name] = aggregate_hash(plot_func, aggregates[key])
+        if previous.get(name) != hashes[name] or not os.path.exists(path):
+            tasks.append((plot_func, aggregates[key], path))
+
+    if len(tasks) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers or len(tasks), initializer=_init_plot_worker) as executor:
+            for future in [executor.submit(*task) for task in tasks]:
+                future.result()
+    else:
+        for plot_func, aggregate, path in tasks:
+            plot_func(aggregate, path)
+
+    with open(plot_hashes_path, "w") as f:
+        json.dump(hashes, f, indent=2)
+    print(f"Gráficos regenerados: {len(tasks)}; sin cambios: {len(EDA_PLOTS) - len(tasks)}.")
+    return [path for _, _, path in tasks]
+
+
+def run_eda(path=cleaned_data_path, workers=None):
+    """Genera los gráficos y el reporte del Análisis Exploratorio de Datos."""
+    os.makedirs(plots_dir, exist_ok=True)
+    # Lectura y agrupación en un solo paso: con DuckDB solo llegan a Python los grupos
+    backend = resolve_backend(path=path)
+    print(f"Contando siniestros en {path} (backend: {backend})...")
+    with span('eda.conteos', backend=backend) as sp:
+        counts = group_counts(COUNT_COLUMNS, path, backend=backend)
+        sp.rows = int(counts.sum())
+    with span('eda.agregados', rows=len(counts)):
+        aggregates = compute_eda_aggregates(counts)
+    with span('eda.graficos') as sp:
+        sp.rows = len(render_plots(aggregates, workers=workers))
+
+    # --- 4. Reporte del Análisis Exploratorio de Datos (EDA) ---
+
+    eda_content = "## Análisis Exploratorio de Datos (EDA)\n\n"
+    eda_content += "### 2.1. Distribución de la Variable Objetivo (Gravedad)\n"
+    eda_content += "La variable objetivo para el modelo predictivo es `gravedad_binaria` (1: Grave - Muerto/Lesionado, 0: Leve - Solo Daños).\n"
+
+    # 2.1. Distribución de la Variable Objetivo
+    gravedad_counts = aggregates['gravedad_pct']
+    eda_content += "La distribución de la gravedad muestra un problema de desbalance de clases:\n"
+    eda_content += f"| Gravedad | Porcentaje |\n| :--- | :--- |\n| Grave (1) | {gravedad_counts.loc[1]:.2f}% |\n| Leve (0) | {gravedad_counts.loc[0]:.2f}% |\n"
+
+    # 2.2. Análisis Temporal
+    eda_content += "\n### 2.2. Análisis Temporal\n"
+    eda_content += "Se generó el gráfico 'siniestros_por_dia_semana.png' mostrando la distribución de siniestros por día de la semana.\n"
+    eda_content += "Se generó el gráfico 'siniestros_por_hora_dia.png' mostrando la distribución de siniestros por hora del día.\n"
+
+    # 2.3. Análisis Geográfico (Localidad)
+    eda_content += "\n### 2.3. Análisis Geográfico (Localidad)\n"
+    eda_content += "Se generó el gráfico 'siniestros_por_localidad.png' mostrando la distribución de siniestros por código de localidad.\n"
+
+    # 2.4. Relación entre Variables y Gravedad
+    eda_content += "\n### 2.4. Relación entre Variables y Gravedad\n"
+    eda_content += "Se generó el gráfico 'gravedad_por_dia_semana.png' para comparar la gravedad por día de la semana.\n"
+
+    # --- 5. Guardar Reporte EDA ---
+    with open(eda_report_path, "w") as f:
+        f.write(eda_content)
+
+    print(f"\nReporte EDA guardado en: {eda_report_path}")
+
+
+def run_feature_encoding(path=cleaned_data_path):
+    """Codifica las variables del modelo y guarda la matriz dispersa y el codificador."""
+    with span('codificacion.lectura') as sp:
+        df = load_cleaned_data(FEATURES + [TARGET], path)
+        sp.rows = len(df)
+
+    # --- 6. Preparación Final para el Modelado ---
+
+    # 6.1. Selección de Características (Features)
+    # Variables predictoras (X):
+    # - dia_semana, hora_del_dia, codigo_localidad, clase, diseno_lugar
+    # Variable objetivo (y):
+    # - gravedad_binaria
+    # (definidas en feature_encoding.FEATURES y feature_encoding.TARGET)
+
+    # 6.2. Manejo de Variables Categóricas (One-Hot Encoding disperso)
+    # Las variables dummy son casi todas ceros, así que se guardan como matriz CSR en lugar de un
+    # DataFrame denso. El codificador ajustado (con su vocabulario de categorías) se guarda para
+    # codificar de la misma forma los registros nuevos en inferencia.
+    with span('codificacion.codificar', rows=len(df)):
+        encoder = fit_encoder(df)
+        X_model = encode(df, encoder)
+        y_model = df[TARGET].to_numpy()
+
+    # 6.3. Guardar la matriz lista para el modelado y el codificador
+    modeling_data_path = FEATURE_MATRIX_PATH
+    with span('codificacion.escritura', rows=X_model.shape[0]):
+        save_feature_matrix(X_model, y_model, feature_names(encoder), modeling_data_path)
+        save_encoder(encoder)
+    prep_content = "## Preparación para el Modelado\n\n"
+    prep_content += f"La matriz final para el modelado, con One-Hot Encoding disperso (CSR), se guardó en: {modeling_data_path}\n"
+    prep_content += f"El codificador ajustado y su vocabulario se guardaron en: {ENCODER_PATH} y {VOCABULARY_PATH}\n"
+    prep_content += (f"La matriz tiene {X_model.shape[0]} filas y {X_model.shape[1]} columnas (sin incluir la variable objetivo), "
+                     f"con {X_model.nnz / max(X_model.shape[0] * X_model.shape[1], 1):.1%} de valores distintos de cero.")
+
+    with open(modeling_prep_report_path, "w") as f:
+        f.write(prep_content)
+
+    print(f"Datos listos para el modelado guardados en: {modeling_data_path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Análisis exploratorio y preparación final para el modelado.")
+    parser.add_argument('--solo', choices=['eda', 'codificacion'],
+                        help="Ejecutar solo el EDA o solo la codificación de variables.")
+    parser.add_argument('--procesos', type=int, default=None,
+                        help="Procesos para dibujar los gráficos del EDA (por defecto, uno por gráfico).")
+    args = parser.parse_args(argv)
+
+    if args.solo != 'codificacion':
+        run_eda(workers=args.procesos)
+    if args.solo != 'eda':
+        run_feature_encoding()
+
+
+if __name__ == "__main__":
+    main()
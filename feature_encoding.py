@@ -0,0 +1,86 @@
+import json
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.preprocessing import OneHotEncoder
+
+# --- Configuración ---
+# Variables predictoras (X) y variable objetivo (y) del modelo
+FEATURES = ['dia_semana', 'hora_del_dia', 'codigo_localidad', 'clase', 'diseno_lugar']
+CATEGORICAL_FEATURES = ['dia_semana', 'codigo_localidad', 'clase', 'diseno_lugar']
+NUMERIC_FEATURES = ['hora_del_dia']
+TARGET = 'gravedad_binaria'
+
+# Matriz dispersa (CSR) lista para el modelado y codificador ajustado
+FEATURE_MATRIX_PATH = "siniestros_viales_modelado.npz"
+MODELS_DIR = "models"
+ENCODER_PATH = os.path.join(MODELS_DIR, "feature_encoder.joblib")
+VOCABULARY_PATH = os.path.join(MODELS_DIR, "feature_vocabulary.json")
+
+# Los valores faltantes se codifican como una categoría más
+MISSING_CATEGORY = 'Sin dato'
+
+
+def categorical_frame(df):
+    """Prepara las columnas categóricas como texto, para que entrenamiento e inferencia coincidan."""
+    columns = {}
+    for col in CATEGORICAL_FEATURES:
+        values = df[col]
+        # Códigos numéricos leídos como float (por nulos): 5.0 y 5 deben ser la misma categoría
+        if pd.api.types.is_float_dtype(values) and (values.dropna() % 1 == 0).all():
+            values = values.astype('Int64')
+        columns[col] = values.astype(object).where(values.notna(), MISSING_CATEGORY).astype(str)
+    return pd.DataFrame(columns, index=df.index)
+
+
+def fit_encoder(df):
+    """Ajusta el One-Hot Encoding disperso sobre las variables categóricas."""
+    # drop='first' equivale al drop_first=True de pd.get_dummies; las categorías no vistas
+    # en el entrenamiento se codifican como ceros
+    encoder = OneHotEncoder(drop='first', handle_unknown='ignore', sparse_output=True, dtype=np.float32)
+    encoder.fit(categorical_frame(df))
+    return encoder
+
+
+def encode(df, encoder):
+    """Codifica filas con un codificador ya ajustado y devuelve una matriz CSR float32."""
+    categorical = encoder.transform(categorical_frame(df))
+    numeric = sparse.csr_matrix(df[NUMERIC_FEATURES].astype('float32').fillna(0).to_numpy())
+    return sparse.hstack([numeric, categorical], format='csr', dtype=np.float32)
+
+
+def feature_names(encoder):
+    return NUMERIC_FEATURES + list(encoder.get_feature_names_out(CATEGORICAL_FEATURES))
+
+
+def save_encoder(encoder, path=ENCODER_PATH, vocabulary_path=VOCABULARY_PATH):
+    """Guarda el codificador y, en JSON legible, el vocabulario de categorías por variable."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    joblib.dump(encoder, path)
+    vocabulary = {
+        'categorical': {col: [str(c) for c in cats] for col, cats in zip(CATEGORICAL_FEATURES, encoder.categories_)},
+        'numeric': NUMERIC_FEATURES,
+        'feature_names': feature_names(encoder),
+    }
+    with open(vocabulary_path, "w") as f:
+        json.dump(vocabulary, f, indent=2, ensure_ascii=False)
+
+
+def load_encoder(path=ENCODER_PATH):
+    return joblib.load(path)
+
+
+def save_feature_matrix(X, y, names, path=FEATURE_MATRIX_PATH):
+    """Guarda la matriz CSR, la variable objetivo y los nombres de columnas en un solo .npz."""
+    X = X.tocsr()
+    np.savez_compressed(path, data=X.data, indices=X.indices, indptr=X.indptr, shape=X.shape,
+                        y=np.asarray(y, dtype=np.int8), feature_names=np.asarray(names))
+
+
+def load_feature_matrix(path=FEATURE_MATRIX_PATH):
+    with np.load(path, allow_pickle=False) as npz:
+        X = sparse.csr_matrix((npz['data'], npz['indices'], npz['indptr']), shape=tuple(npz['shape']))
+        return X, npz['y'], list(npz['feature_names'])
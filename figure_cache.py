@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# --- Caché de Figuras del Dashboard ---
+# Las figuras dependen solo de la selección de filtros y de la versión del archivo de datos.
+# La caché guarda el resultado por selección normalizada, con tamaño máximo (LRU),
+# expiración (TTL) y dos backends: en memoria (por proceso) o en disco (compartido
+# entre los workers de gunicorn).
+
+DEFAULT_MAXSIZE = 128
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_CACHE_DIR = ".cache_dashboard"
+
+
+def data_file_version(path):
+    """Versión del archivo de datos (fecha de modificación y tamaño); cambia al regenerarlo."""
+    if not os.path.exists(path):
+        return "sin-datos"
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+class MemoryBackend:
+    """Backend en memoria del proceso, con desalojo LRU."""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class FileSystemBackend:
+    """
+    Backend en disco compartido entre procesos.
+
+    Cada entrada es un archivo pickle; la fecha de modificación hace de marca LRU
+    (se actualiza en cada lectura) y las escrituras son atómicas con `os.replace`.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, maxsize=DEFAULT_MAXSIZE):
+        self.directory = directory
+        self.maxsize = maxsize
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def _entry_files(self):
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.pkl')]
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+            os.utime(path)
+            return entry
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def set(self, key, entry):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        files = self._entry_files()
+        if len(files) <= self.maxsize:
+            return
+        mtimes = {}
+        for path in files:
+            try:
+                mtimes[path] = os.path.getmtime(path)
+            except FileNotFoundError:
+                pass
+        # Otro worker pudo haber borrado el archivo entre el listado y el borrado
+        for path in sorted(mtimes, key=mtimes.get)[:len(mtimes) - self.maxsize]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def __len__(self):
+        return len(self._entry_files())
+
+
+class FigureCache:
+    """Memoiza el resultado de un callback por selección de filtros y versión de los datos."""
+
+    def __init__(self, backend, data_version, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.backend = backend
+        self.data_version = data_version
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, *selections):
+        """Clave estable: cada selección se normaliza como lista ordenada sin duplicados."""
+        normalized = [sorted(set(selection or [])) for selection in selections]
+        payload = json.dumps([self.data_version, normalized], ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get_or_compute(self, compute, *selections):
+        key = self.make_key(*selections)
+        entry = self.backend.get(key)
+        if entry is not None:
+            fresh = time.time() - entry['created'] <= self.ttl_seconds
+            if fresh and entry['version'] == self.data_version:
+                self.hits += 1
+                return entry['value']
+            self.backend.delete(key)
+
+        self.misses += 1
+        value = compute(*selections)
+        self.backend.set(key, {'created': time.time(), 'version': self.data_version, 'value': value})
+        return value
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': len(self.backend),
+            'data_version': self.data_version,
+        }
+
+
+def cache_from_env(data_path):
+    """
+    Crea la caché según variables de entorno:
+    DASH_CACHE_BACKEND (memory | filesystem), DASH_CACHE_DIR, DASH_CACHE_MAXSIZE y DASH_CACHE_TTL.
+    """
+    maxsize = int(os.environ.get('DASH_CACHE_MAXSIZE', DEFAULT_MAXSIZE))
+    if os.environ.get('DASH_CACHE_BACKEND', 'memory') == 'filesystem':
+        backend = FileSystemBackend(os.environ.get('DASH_CACHE_DIR', DEFAULT_CACHE_DIR), maxsize)
+    else:
+        backend = MemoryBackend(maxsize)
+    ttl = int(os.environ.get('DASH_CACHE_TTL', DEFAULT_TTL_SECONDS))
+    return FigureCache(backend, data_file_version(data_path), ttl_seconds=ttl)
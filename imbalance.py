@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+from imblearn.over_sampling import SMOTE, SMOTENC
+from imblearn.under_sampling import RandomUnderSampler
+from scipy import sparse
+from sklearn.base import BaseEstimator
+from sklearn.decomposition import TruncatedSVD
+from sklearn.neighbors import KDTree
+
+from feature_encoding import CATEGORICAL_FEATURES, NUMERIC_FEATURES, categorical_frame, encode
+
+# --- Estrategias para el Desbalance de Clases ---
+# - smote: SMOTE con k-NN exacto (fuerza bruta) sobre todas las columnas One-Hot.
+# - pesos_balanceados: sin remuestreo; la pérdida pondera cada clase por el inverso de su frecuencia.
+# - submuestreo: submuestreo aleatorio de la clase mayoritaria (conserva la minoritaria completa).
+# - smotenc: SMOTE-NC sobre las variables originales (categorías + hora), antes del One-Hot.
+# - smote_aproximado: SMOTE con vecinos buscados en un espacio reducido (TruncatedSVD + KD-tree).
+IMBALANCE_STRATEGIES = ['smote', 'pesos_balanceados', 'submuestreo', 'smotenc', 'smote_aproximado']
+
+STRATEGY_DESCRIPTIONS = {
+    'smote': "SMOTE (Synthetic Minority Over-sampling Technique) aplicado al conjunto de entrenamiento",
+    'pesos_balanceados': "Pesos de clase balanceados en la función de pérdida (sin remuestreo)",
+    'submuestreo': "Submuestreo aleatorio de la clase mayoritaria en el conjunto de entrenamiento",
+    'smotenc': "SMOTE-NC sobre las variables categóricas originales, antes del One-Hot Encoding",
+    'smote_aproximado': "SMOTE con vecinos aproximados (TruncatedSVD + KD-tree) en el conjunto de entrenamiento",
+}
+
+
+class ReducedSpaceNeighbors(BaseEstimator):
+    """
+    Vecinos más cercanos aproximados para SMOTE sobre matrices One-Hot grandes.
+
+    El k-NN exacto de SMOTE compara cada fila con todas las demás en cientos de columnas
+    dispersas (fuerza bruta). Aquí las filas se proyectan a `n_components` dimensiones densas
+    con TruncatedSVD y los vecinos se buscan con un KD-tree en ese espacio. Los vecinos pueden
+    diferir de los exactos, pero las muestras sintéticas se siguen generando en el espacio
+    original.
+    """
+
+    def __init__(self, n_neighbors=6, n_components=16, leaf_size=40, random_state=None):
+        self.n_neighbors = n_neighbors
+        self.n_components = n_components
+        self.leaf_size = leaf_size
+        self.random_state = random_state
+
+    def _project(self, X):
+        if self.svd_ is None:
+            return X.toarray() if sparse.issparse(X) else np.asarray(X)
+        return self.svd_.transform(X)
+
+    def fit(self, X, y=None):
+        n_components = min(self.n_components, X.shape[1] - 1)
+        self.svd_ = TruncatedSVD(n_components, random_state=self.random_state).fit(X) if n_components > 0 else None
+        self.tree_ = KDTree(self._project(X), leaf_size=self.leaf_size)
+        self.n_samples_fit_ = X.shape[0]
+        return self
+
+    def kneighbors(self, X=None, n_neighbors=None, return_distance=True):
+        n_neighbors = min(n_neighbors or self.n_neighbors, self.n_samples_fit_)
+        distances, indices = self.tree_.query(self._project(X), k=n_neighbors)
+        return (distances, indices) if return_distance else indices
+
+    def kneighbors_graph(self, X=None, n_neighbors=None, mode='connectivity'):
+        indices = self.kneighbors(X, n_neighbors, return_distance=False)
+        n_rows, k = indices.shape
+        return sparse.csr_matrix((np.ones(n_rows * k), indices.ravel(), np.arange(0, n_rows * k + 1, k)),
+                                 shape=(n_rows, self.n_samples_fit_))
+
+
+def make_sampler(strategy, random_state=42):
+    """Remuestreador de imblearn para la estrategia, o None si no remuestrea."""
+    if strategy == 'smote':
+        return SMOTE(random_state=random_state)
+    if strategy == 'submuestreo':
+        return RandomUnderSampler(random_state=random_state)
+    if strategy == 'smote_aproximado':
+        return SMOTE(random_state=random_state, k_neighbors=ReducedSpaceNeighbors(random_state=random_state))
+    if strategy == 'smotenc':
+        # Índices de las columnas categóricas en el DataFrame [NUMERIC_FEATURES + CATEGORICAL_FEATURES]
+        return SMOTENC(categorical_features=list(range(len(NUMERIC_FEATURES),
+                                                       len(NUMERIC_FEATURES) + len(CATEGORICAL_FEATURES))),
+                       random_state=random_state)
+    if strategy == 'pesos_balanceados':
+        return None
+    raise ValueError(f"Estrategia de desbalance desconocida: {strategy} (opciones: {IMBALANCE_STRATEGIES})")
+
+
+def resample(strategy, X_train, y_train, raw_train=None, encoder=None, random_state=42):
+    """
+    Aplica la estrategia al conjunto de entrenamiento.
+
+    Devuelve (X, y, class_weight): la matriz y la variable objetivo a usar en el ajuste y el
+    `class_weight` del modelo. 'smotenc' remuestrea `raw_train` (las variables originales,
+    alineadas fila a fila con `X_train`) y codifica el resultado con `encoder`.
+    """
+    if strategy == 'pesos_balanceados':
+        return X_train, y_train, 'balanced'
+
+    sampler = make_sampler(strategy, random_state)
+    if strategy == 'smotenc':
+        if raw_train is None or encoder is None:
+            raise ValueError("La estrategia 'smotenc' necesita las variables originales y el codificador.")
+        # Misma preparación que feature_encoding.encode: categorías como texto, nulos numéricos en 0
+        frame = pd.concat([raw_train[NUMERIC_FEATURES].astype('float64').fillna(0),
+                           categorical_frame(raw_train)], axis=1)
+        frame_res, y_res = sampler.fit_resample(frame, y_train)
+        return encode(frame_res, encoder), y_res, None
+
+    X_res, y_res = sampler.fit_resample(X_train, y_train)
+    return X_res, y_res, None
@@ -0,0 +1,297 @@
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from scipy import sparse
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import recall_score, roc_auc_score
+from sklearn.model_selection import train_test_split
+
+from data_store import CLEANED_DATA_PATH
+from feature_encoding import (CATEGORICAL_FEATURES, FEATURES, MISSING_CATEGORY, MODELS_DIR, NUMERIC_FEATURES, TARGET,
+                              categorical_frame, encode, feature_names, fit_encoder)
+from instrumentation import span
+from model_artifact import load_model_artifact, save_model_artifact
+from query_backend import load_columns
+
+# --- Configuración ---
+# Estado del modo incremental: marca de agua, snapshot de distribuciones y métricas de referencia
+incremental_state_path = os.path.join(MODELS_DIR, "incremental_state.json")
+DATE_COLUMN = 'fecha_hora_accidente'
+
+# Umbrales para pasar de la actualización incremental al reentrenamiento completo:
+# - PSI de alguna variable frente al snapshot (> 0.2 se considera un cambio importante);
+# - fracción de filas nuevas con categorías fuera del vocabulario fijo del codificador;
+# - caída del ROC AUC del modelo actual sobre los datos nuevos frente al de referencia;
+# - filas que llegaron tarde (fecha anterior o igual a la marca de agua), como fracción de las nuevas.
+PSI_THRESHOLD = 0.2
+UNSEEN_THRESHOLD = 0.05
+AUC_DROP_THRESHOLD = 0.05
+LATE_THRESHOLD = 0.05
+# Filas nuevas mínimas para estimar el ROC AUC (se necesitan además ambas clases)
+MIN_ROWS_FOR_METRICS = 200
+# Filas por llamada a partial_fit
+PARTIAL_FIT_ROWS = 50_000
+# Fracción de las filas nuevas reservada para evaluar el modelo actualizado (como la prueba del entrenamiento completo)
+EVAL_FRACTION = 0.3
+
+
+class IncrementalLogisticModel(BaseEstimator, ClassifierMixin):
+    """
+    Regresión logística ajustada con SGD promediado, actualizable con `partial_fit`.
+
+    Las columnas se escalan por su máximo absoluto del entrenamiento completo (la hora queda en
+    [0, 1], igual que las columnas One-Hot); la escala se conserva en las actualizaciones
+    para que los coeficientes sigan siendo comparables. Los pesos de clase también se fijan
+    en el entrenamiento completo, porque SMOTE no se puede aplicar por lotes.
+    """
+
+    def __init__(self, alpha=1e-4, class_weight=None, random_state=42):
+        self.alpha = alpha
+        self.class_weight = class_weight
+        self.random_state = random_state
+
+    def _scale(self, X):
+        return sparse.csr_matrix(X) @ sparse.diags(self.scale_)
+
+    def fit(self, X, y):
+        max_abs = abs(sparse.csr_matrix(X)).max(axis=0).toarray().ravel()
+        self.scale_ = np.where(max_abs > 0, 1 / np.maximum(max_abs, 1e-12), 1).astype(np.float32)
+        self.sgd_ = SGDClassifier(loss='log_loss', alpha=self.alpha, average=True,
+                                  class_weight=self.class_weight, random_state=self.random_state)
+        self.sgd_.fit(self._scale(X), y)
+        self.classes_ = self.sgd_.classes_
+        return self
+
+    def partial_fit(self, X, y):
+        self.sgd_.partial_fit(self._scale(X), y, classes=self.classes_)
+        return self
+
+    def predict_proba(self, X):
+        return self.sgd_.predict_proba(self._scale(X))
+
+    def predict(self, X):
+        return self.sgd_.predict(self._scale(X))
+
+
+# --- 1. Distribuciones y Drift ---
+
+def feature_frame(df):
+    """Variables del modelo como texto (la hora como categoría 0–23), con los nulos como 'Sin dato'."""
+    frame = categorical_frame(df)
+    for col in NUMERIC_FEATURES:
+        values = df[col].astype('Int64')
+        frame[col] = values.astype(str).where(values.notna(), MISSING_CATEGORY)
+    return frame[FEATURES]
+
+
+def feature_distributions(df):
+    """Proporción de cada valor por variable, para el snapshot y para los datos nuevos."""
+    frame = feature_frame(df)
+    return {col: {str(k): float(v) for k, v in frame[col].value_counts(normalize=True).items()} for col in FEATURES}
+
+
+def population_stability_index(expected, actual, epsilon=1e-4):
+    """PSI entre dos distribuciones {valor: proporción}; los valores ausentes cuentan como `epsilon`."""
+    values = sorted(set(expected) | set(actual))
+    e = np.maximum([expected.get(v, 0.0) for v in values], epsilon)
+    a = np.maximum([actual.get(v, 0.0) for v in values], epsilon)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def unseen_rate(df, encoder):
+    """Fracción de filas con alguna categoría que no está en el vocabulario del codificador."""
+    frame = categorical_frame(df)
+    unseen = np.zeros(len(df), dtype=bool)
+    for col, categories in zip(CATEGORICAL_FEATURES, encoder.categories_):
+        unseen |= ~frame[col].isin(categories).to_numpy()
+    return float(unseen.mean()) if len(df) else 0.0
+
+
+def drift_report(snapshot, df, encoder):
+    distributions = feature_distributions(df)
+    return {
+        'psi': {col: population_stability_index(snapshot[col], distributions[col]) for col in FEATURES},
+        'categorias_nuevas': unseen_rate(df, encoder),
+    }
+
+
+# --- 2. Estado ---
+
+def load_state(path=incremental_state_path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(state, path=incremental_state_path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+
+
+def load_new_rows(path, watermark):
+    """
+    Filas con fecha posterior a la marca de agua.
+
+    El filtro se aplica al leer el Parquet: los grupos de filas cuyas estadísticas de fecha
+    quedan por debajo de la marca de agua no se leen.
+    """
+    table = pq.read_table(path, columns=FEATURES + [TARGET, DATE_COLUMN],
+                          filters=[(DATE_COLUMN, '>', pd.Timestamp(watermark))])
+    return table.to_pandas()
+
+
+def count_rows_up_to(path, watermark):
+    """
+    Filas con fecha anterior o igual a la marca de agua, o sin fecha.
+
+    Comparado con las que el modelo ya cubre, el aumento corresponde a filas que llegaron
+    tarde: el filtro '>' de `load_new_rows` no las lee.
+    """
+    date = ds.field(DATE_COLUMN)
+    return ds.dataset(path).count_rows(filter=(date <= pd.Timestamp(watermark)) | date.is_null())
+
+
+def evaluate(model, X, y):
+    y_proba = model.predict_proba(X)[:, 1]
+    return {'roc_auc': roc_auc_score(y, y_proba), 'recall': recall_score(y, (y_proba >= 0.5).astype(int))}
+
+
+# --- 3. Entrenamiento Completo e Incremental ---
+
+def full_retrain(path=CLEANED_DATA_PATH, reasons=None):
+    """
+    Entrena desde cero sobre todo el histórico y guarda el snapshot de referencia.
+
+    El codificador se vuelve a ajustar (vocabulario nuevo) y queda fijo hasta el siguiente
+    reentrenamiento completo.
+    """
+    print("Reentrenamiento completo sobre todo el histórico...")
+    with span('incremental.completo') as sp:
+        df = load_columns(FEATURES + [TARGET, DATE_COLUMN], path)
+        sp.rows = len(df)
+        encoder = fit_encoder(df)
+        X, y = encode(df, encoder), df[TARGET].to_numpy()
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42, stratify=y)
+
+        # Pesos 'balanced' calculados una sola vez: partial_fit no admite class_weight='balanced'
+        counts = np.bincount(y_train, minlength=2)
+        class_weight = {c: len(y_train) / (2 * counts[c]) for c in (0, 1)}
+        model = IncrementalLogisticModel(class_weight=class_weight).fit(X_train, y_train)
+        metrics = evaluate(model, X_test, y_test)
+
+    artifact_path = save_model_artifact(model, encoder, feature_names(encoder), metrics,
+                                        extra={'entrenamiento': 'completo', 'desbalance': 'pesos_balanceados'})
+    previous = load_state() or {}
+    state = {
+        'marca_de_agua': str(df[DATE_COLUMN].max()),
+        'artefacto': artifact_path,
+        'metricas_referencia': metrics,
+        'snapshot': feature_distributions(df),
+        'filas_entrenamiento': int(len(df)),
+        # Filas hasta la marca de agua ya cubiertas, para detectar las que lleguen tarde
+        'filas_cubiertas': int(len(df)),
+        'historial': previous.get('historial', []) + [{
+            'fecha': datetime.now().isoformat(timespec='seconds'), 'tipo': 'completo',
+            'filas': int(len(df)), 'motivos': reasons or [], 'metricas': metrics}],
+    }
+    save_state(state)
+    print(f"ROC AUC (prueba): {metrics['roc_auc']:.4f}; recall: {metrics['recall']:.4f}.")
+    return state
+
+
+def incremental_update(path=CLEANED_DATA_PATH, force_full=False):
+    """
+    Actualiza el modelo solo con las filas posteriores a la marca de agua.
+
+    Antes de actualizar se mide el drift (PSI por variable y categorías fuera del vocabulario)
+    y el ROC AUC del modelo actual sobre las filas nuevas, y se cuentan las filas que llegaron
+    con fecha anterior o igual a la marca de agua. Si algún umbral se supera, se reentrena
+    desde cero; si no, el modelo se actualiza con `partial_fit` y el costo depende solo del
+    volumen de datos nuevos. Una parte de las filas nuevas se reserva para medir el modelo
+    actualizado, que son las métricas que se guardan en el artefacto.
+    """
+    state = load_state()
+    if force_full or state is None:
+        return full_retrain(path, ["forzado" if force_full else "sin modelo incremental previo"])
+
+    artifact = load_model_artifact(state['artefacto'])
+    model, encoder = artifact['model'], artifact['encoder']
+    if not hasattr(model, 'partial_fit'):
+        return full_retrain(path, ["el artefacto no admite actualización incremental"])
+
+    with span('incremental.lectura') as sp:
+        new = load_new_rows(path, state['marca_de_agua'])
+        sp.rows = len(new)
+        # Los estados anteriores a este conteo no registran las filas cubiertas: se empieza a contar ahora
+        covered = count_rows_up_to(path, state['marca_de_agua'])
+        late = max(covered - state.get('filas_cubiertas', covered), 0)
+    if late > LATE_THRESHOLD * len(new):
+        reason = f"{late} filas llegaron con fecha anterior o igual a la marca de agua ({state['marca_de_agua']})"
+        print(f"Aviso: {reason}; se reentrena desde cero para incluirlas.")
+        return full_retrain(path, [reason])
+    if late:
+        print(f"Aviso: {late} filas llegaron con fecha anterior o igual a {state['marca_de_agua']} y no se usan "
+              f"en la actualización incremental; --reentrenar las incluye.")
+    if new.empty:
+        print(f"No hay filas posteriores a {state['marca_de_agua']}; el modelo no cambia.")
+        return state
+    print(f"{len(new)} filas nuevas posteriores a {state['marca_de_agua']}.")
+
+    with span('incremental.drift', rows=len(new)):
+        X_new, y_new = encode(new, encoder), new[TARGET].to_numpy()
+        drift = drift_report(state['snapshot'], new, encoder)
+        # Evaluación del modelo actual sobre datos que todavía no vio
+        metrics = None
+        if len(new) >= MIN_ROWS_FOR_METRICS and len(np.unique(y_new)) == 2:
+            metrics = evaluate(model, X_new, y_new)
+
+    reasons = [f"PSI de {col} = {value:.3f}" for col, value in drift['psi'].items() if value > PSI_THRESHOLD]
+    if drift['categorias_nuevas'] > UNSEEN_THRESHOLD:
+        reasons.append(f"{drift['categorias_nuevas']:.1%} de filas con categorías fuera del vocabulario")
+    if metrics is not None and state['metricas_referencia']['roc_auc'] - metrics['roc_auc'] > AUC_DROP_THRESHOLD:
+        reasons.append(f"ROC AUC {metrics['roc_auc']:.3f} frente a {state['metricas_referencia']['roc_auc']:.3f}")
+    if reasons:
+        print("Se supera un umbral de drift o de métricas: " + "; ".join(reasons))
+        return full_retrain(path, reasons)
+
+    # El modelo actualizado se evalúa sobre filas nuevas que no usó; con pocas filas o una sola
+    # clase no se pueden medir y el artefacto conserva las métricas de la versión anterior
+    X_fit, y_fit, X_eval, y_eval = X_new, y_new, None, None
+    if metrics is not None and np.bincount(y_new).min() >= 2:
+        X_fit, X_eval, y_fit, y_eval = train_test_split(X_new, y_new, test_size=EVAL_FRACTION, random_state=42,
+                                                        stratify=y_new)
+    with span('incremental.actualizacion', rows=X_fit.shape[0]):
+        for start in range(0, X_fit.shape[0], PARTIAL_FIT_ROWS):
+            model.partial_fit(X_fit[start:start + PARTIAL_FIT_ROWS], y_fit[start:start + PARTIAL_FIT_ROWS])
+
+    if X_eval is not None:
+        updated_metrics = evaluate(model, X_eval, y_eval)
+        evaluation = f"modelo actualizado sobre {X_eval.shape[0]} filas nuevas reservadas"
+    else:
+        updated_metrics = artifact['metrics']
+        evaluation = f"heredadas de la versión {artifact['version']} (filas nuevas insuficientes para medir)"
+    state['artefacto'] = save_model_artifact(model, encoder, artifact['feature_names'], updated_metrics,
+                                             extra={'entrenamiento': 'incremental', 'filas_nuevas': int(len(new)),
+                                                    'desbalance': 'pesos_balanceados', 'evaluacion': evaluation,
+                                                    'metricas_previas_datos_nuevos': metrics})
+    state['marca_de_agua'] = str(new[DATE_COLUMN].max())
+    state['filas_entrenamiento'] += int(X_fit.shape[0])
+    state['filas_cubiertas'] = count_rows_up_to(path, state['marca_de_agua'])
+    state['historial'].append({
+        'fecha': datetime.now().isoformat(timespec='seconds'), 'tipo': 'incremental', 'filas': int(len(new)),
+        'filas_tardias': int(late), 'psi': drift['psi'], 'categorias_nuevas': drift['categorias_nuevas'],
+        'metricas_previas_datos_nuevos': metrics, 'metricas': updated_metrics if X_eval is not None else None})
+    save_state(state)
+    print(f"Modelo actualizado con {X_fit.shape[0]} filas nuevas; PSI máximo: {max(drift['psi'].values()):.3f}.")
+    if X_eval is not None:
+        print(f"ROC AUC del modelo actualizado ({X_eval.shape[0]} filas reservadas): {updated_metrics['roc_auc']:.4f}; "
+              f"recall: {updated_metrics['recall']:.4f}.")
+    return state
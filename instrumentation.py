@@ -0,0 +1,190 @@
+import argparse
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows: no hay getrusage
+    resource = None
+
+try:
+    import psutil
+except ImportError:  # dependencia opcional: sin psutil no se registra la memoria al inicio y al final del span
+    psutil = None
+
+# --- Configuración ---
+# Cada span terminado se agrega como una línea JSON a este archivo
+METRICS_PATH = os.environ.get('PIPELINE_METRICS_PATH', "performance_log.jsonl")
+# Spans a perfilar con cProfile: nombres separados por comas (o prefijos como 'modelado.'), o 'all'
+PROFILE_SPANS = os.environ.get('PIPELINE_PROFILE', "")
+PROFILE_DIR = os.environ.get('PIPELINE_PROFILE_DIR', "profiles")
+
+_local = threading.local()
+
+
+def peak_rss_mb():
+    """
+    Memoria residente máxima del proceso en MB desde que arrancó (None si no se puede medir).
+
+    Es un máximo del proceso, no del span: en un worker reutilizado de un pool puede venir
+    de una tarea anterior. Para el consumo del span se usan `rss_start_mb` y `rss_end_mb`.
+    """
+    if resource is not None:
+        # ru_maxrss está en bytes en macOS y en KB en Linux y los demás Unix
+        scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    if psutil is not None:
+        # En Windows memory_info() incluye el máximo del working set (peak_wset)
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+    return None
+
+
+def rss_mb():
+    """Memoria residente actual del proceso en MB (None sin psutil)."""
+    if psutil is None:
+        return None
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def _round(value, digits=1):
+    return None if value is None else round(value, digits)
+
+
+def _should_profile(name, profile):
+    if profile is not None:
+        return profile
+    selected = [s.strip() for s in PROFILE_SPANS.split(',') if s.strip()]
+    return 'all' in selected or any(name == s or (s.endswith('.') and name.startswith(s)) for s in selected)
+
+
+class Span:
+    """Mediciones de un bloque de código; `rows` puede asignarse dentro del bloque."""
+
+    def __init__(self, name, rows=None, **extra):
+        self.name = name
+        self.rows = rows
+        self.extra = extra
+
+    def record(self, parent, wall, cpu, rss_start, rss_end, profile_path):
+        record = {
+            'span': self.name,
+            'parent': parent,
+            'start': self.started_at,
+            'wall_s': round(wall, 6),
+            'cpu_s': round(cpu, 6),
+            'peak_rss_mb': _round(peak_rss_mb()),
+            'rss_start_mb': _round(rss_start),
+            'rss_end_mb': _round(rss_end),
+            'rows': None if self.rows is None else int(self.rows),
+            'pid': os.getpid(),
+        }
+        if profile_path:
+            record['profile'] = profile_path
+        record.update(self.extra)
+        return record
+
+
+@contextmanager
+def span(name, rows=None, profile=None, **extra):
+    """
+    Mide tiempo de reloj, tiempo de CPU del proceso, memoria y filas de un bloque, y lo escribe
+    como una línea JSON en `METRICS_PATH`. Los spans pueden anidarse.
+
+    `peak_rss_mb` es el máximo del proceso hasta el final del span; con psutil se registra
+    además la memoria residente al inicio y al final del bloque. Las mediciones que la
+    plataforma no expone se escriben como null.
+
+    Si el span está en `PIPELINE_PROFILE` (o `profile=True`), el bloque se ejecuta bajo cProfile
+    y las estadísticas se guardan en `PROFILE_DIR/<span>_<fecha>.prof` (formato pstats, apto para
+    snakeviz, flameprof o gprof2dot). Dentro de un span perfilado, los spans anidados no inician
+    otro perfilador (cProfile admite uno activo por hilo): el archivo del span externo ya los cubre.
+    """
+    current = Span(name, rows=rows, **extra)
+    current.started_at = datetime.now().isoformat(timespec='milliseconds')
+    stack = _local.__dict__.setdefault('stack', [])
+    parent = stack[-1].name if stack else None
+    enclosing_profiled = bool(stack) and stack[-1].profiled
+    profiler = cProfile.Profile() if _should_profile(name, profile) and not enclosing_profiled else None
+    current.profiled = enclosing_profiled or profiler is not None
+
+    stack.append(current)
+    rss_start = rss_mb()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield current
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+        stack.pop()
+
+        profile_path = None
+        if profiler is not None:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            safe_name = re.sub(r'[^\w.-]', '_', name)
+            profile_path = os.path.join(PROFILE_DIR, f"{safe_name}_{datetime.now():%Y%m%d_%H%M%S}_{os.getpid()}.prof")
+            profiler.dump_stats(profile_path)
+        _write_record(current.record(parent, wall, cpu, rss_start, rss_mb(), profile_path))
+
+
+def _write_record(record):
+    directory = os.path.dirname(METRICS_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Una sola escritura por línea en modo append: varios procesos pueden compartir el archivo
+    with open(METRICS_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+
+def read_spans(path=METRICS_PATH):
+    """Lee el registro de spans como lista de diccionarios."""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(records):
+    """Resumen por span: ejecuciones, tiempo medio y máximo, CPU media y memoria máxima."""
+    summary = {}
+    for record in records:
+        entry = summary.setdefault(record['span'], {'n': 0, 'wall_s': 0.0, 'wall_max_s': 0.0, 'cpu_s': 0.0,
+                                                    'peak_rss_mb': 0.0})
+        entry['n'] += 1
+        entry['wall_s'] += record['wall_s']
+        entry['wall_max_s'] = max(entry['wall_max_s'], record['wall_s'])
+        entry['cpu_s'] += record['cpu_s']
+        entry['peak_rss_mb'] = max(entry['peak_rss_mb'], record['peak_rss_mb'] or 0.0)
+    for entry in summary.values():
+        entry['wall_s'] /= entry['n']
+        entry['cpu_s'] /= entry['n']
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resumen del registro de spans de rendimiento.")
+    parser.add_argument('--log', default=METRICS_PATH, help="Archivo JSON lines con los spans.")
+    args = parser.parse_args(argv)
+
+    summary = summarize(read_spans(args.log))
+    if not summary:
+        print(f"No hay spans registrados en {args.log}.")
+        return
+    print(f"{'span':<32} {'n':>5} {'media (s)':>10} {'máx (s)':>10} {'CPU (s)':>10} {'RSS máx (MB)':>13}")
+    for name, entry in sorted(summary.items(), key=lambda item: -item[1]['wall_s']):
+        print(f"{name:<32} {entry['n']:>5} {entry['wall_s']:>10.3f} {entry['wall_max_s']:>10.3f} "
+              f"{entry['cpu_s']:>10.3f} {entry['peak_rss_mb']:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
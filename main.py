@@ -1,5 +1,217 @@
-def main():
-    print("Hello from data-analitys-cun!")
+import os
+
+# Los gráficos se generan en procesos sin pantalla; se fija el backend antes de importar matplotlib
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import argparse
+import hashlib
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+
+import data_preparation
+import eda_and_modeling_prep
+import modeling
+import spatial_index
+import time_rollup
+import validation
+from data_store import CLEANED_DATA_PATH, file_sha256
+from feature_encoding import ENCODER_PATH, FEATURE_MATRIX_PATH, VOCABULARY_PATH
+from instrumentation import span
+from model_artifact import LATEST_PATH
+
+# --- Configuración ---
+# Huella de la última ejecución exitosa de cada etapa
+state_path = ".pipeline_state.json"
+# Los módulos de `Stage.code` se leen junto a este archivo, sin importar el directorio de trabajo
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@dataclass
+class Stage:
+    """
+    Etapa del pipeline: una función con entradas y salidas declaradas.
+
+    La etapa se omite si la huella (contenido de las entradas, código fuente y parámetros)
+    coincide con la de la última ejecución exitosa y todas sus salidas existen. `code` debe
+    incluir el módulo de la etapa y todos los módulos locales que importa, directa o
+    indirectamente, con rutas relativas al directorio de `main.py`: un cambio en cualquiera de
+    ellos vuelve a ejecutar la etapa.
+    """
+    name: str
+    func: object
+    inputs: list
+    outputs: list
+    code: list
+    params: dict = field(default_factory=dict)
+    deps: list = field(default_factory=list)
+
+    def fingerprint(self):
+        digest = hashlib.sha256()
+        files = [(path, path) for path in self.inputs] + [(path, os.path.join(CODE_DIR, path)) for path in self.code]
+        for name, path in files:
+            digest.update(name.encode('utf-8'))
+            digest.update((file_sha256(path) if os.path.exists(path) else "missing").encode('utf-8'))
+        digest.update(json.dumps(self.params, sort_keys=True, default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+    def outputs_exist(self):
+        return all(os.path.exists(path) for path in self.outputs)
+
+
+# --- 1. Definición de las Etapas ---
+
+def build_stages(source_path=data_preparation.file_path):
+    eda_plots = [os.path.join(eda_and_modeling_prep.plots_dir, name) for name in (
+        'siniestros_por_dia_semana.png', 'siniestros_por_hora_dia.png',
+        'siniestros_por_localidad.png', 'gravedad_por_dia_semana.png')]
+    stages = [
+        Stage('preparacion', data_preparation.prepare_data,
+              inputs=[source_path],
+              outputs=[CLEANED_DATA_PATH, data_preparation.metadata_path,
+                       spatial_index.hex_index_path(CLEANED_DATA_PATH),
+                       time_rollup.time_rollup_path(CLEANED_DATA_PATH)],
+              code=['data_preparation.py', 'data_store.py', 'spatial_index.py', 'time_rollup.py', 'streaming_stats.py',
+                    'instrumentation.py'],
+              params={'source_path': source_path}),
+        # La validación detiene el pipeline antes del EDA y el entrenamiento si el dataset limpio
+        # no cumple el esquema o los umbrales de calidad
+        Stage('validacion', validation.validate_data,
+              inputs=[CLEANED_DATA_PATH],
+              outputs=[validation.validation_report_path],
+              code=['validation.py', 'data_store.py', 'instrumentation.py'],
+              params={'thresholds': validation.THRESHOLDS},
+              deps=['preparacion']),
+        # EDA y codificación solo dependen del dataset limpio validado: se ejecutan en paralelo
+        Stage('eda', eda_and_modeling_prep.run_eda,
+              inputs=[CLEANED_DATA_PATH],
+              outputs=[eda_and_modeling_prep.eda_report_path] + eda_plots,
+              code=['eda_and_modeling_prep.py', 'feature_encoding.py', 'query_backend.py', 'data_store.py',
+                    'instrumentation.py'],
+              deps=['validacion']),
+        Stage('codificacion', eda_and_modeling_prep.run_feature_encoding,
+              inputs=[CLEANED_DATA_PATH],
+              outputs=[FEATURE_MATRIX_PATH, ENCODER_PATH, VOCABULARY_PATH,
+                       eda_and_modeling_prep.modeling_prep_report_path],
+              code=['eda_and_modeling_prep.py', 'feature_encoding.py', 'query_backend.py', 'data_store.py',
+                    'instrumentation.py'],
+              deps=['validacion']),
+        Stage('modelado', modeling.run_modeling,
+              inputs=[FEATURE_MATRIX_PATH, ENCODER_PATH],
+              outputs=[modeling.modeling_report_path, os.path.join(modeling.plots_dir, 'roc_curve.png'), LATEST_PATH],
+              code=['modeling.py', 'feature_encoding.py', 'query_backend.py', 'model_artifact.py', 'model_selection.py',
+                    'data_store.py', 'instrumentation.py', 'imbalance.py', 'incremental_training.py'],
+              deps=['codificacion']),
+    ]
+    return {stage.name: stage for stage in stages}
+
+
+def downstream(stages, name):
+    """Nombre de la etapa y de todas las que dependen de ella, directa o indirectamente."""
+    selected = {name}
+    changed = True
+    while changed:
+        changed = False
+        for stage in stages.values():
+            if stage.name not in selected and selected.intersection(stage.deps):
+                selected.add(stage.name)
+                changed = True
+    return selected
+
+
+# --- 2. Estado de Ejecuciones Anteriores ---
+
+def load_state(path=state_path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(state, path=state_path):
+    with open(path, "w") as f:
+        json.dump(state, f, indent=2)
+
+
+# --- 3. Ejecución ---
+
+def _run_stage(name, func, params):
+    # Se ejecuta en un proceso del pool; el valor de retorno de la etapa no se envía de vuelta
+    start = time.perf_counter()
+    with span(name):
+        func(**params)
+    return time.perf_counter() - start
+
+
+def run_pipeline(stages, force=(), jobs=None):
+    """
+    Ejecuta las etapas en orden de dependencias. Las etapas listas e independientes entre sí
+    se ejecutan en paralelo; las etapas cuya huella no cambió se omiten, salvo las de `force`.
+    Devuelve el estado final de cada etapa: 'ejecutada', 'omitida' o 'fallida'.
+    """
+    state = load_state()
+    status = {}
+    pending = dict(stages)
+    running = {}
+
+    with ProcessPoolExecutor(max_workers=jobs or len(stages)) as executor:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                dep_status = [status.get(dep) for dep in stage.deps]
+                if any(s in ('fallida', 'bloqueada') for s in dep_status):
+                    print(f"[{name}] bloqueada: falló una etapa de la que depende.")
+                    status[name] = 'bloqueada'
+                    del pending[name]
+                elif all(s in ('ejecutada', 'omitida') for s in dep_status):
+                    # La huella se calcula cuando las entradas ya fueron producidas por las etapas previas
+                    fingerprint = stage.fingerprint()
+                    del pending[name]
+                    if name not in force and state.get(name) == fingerprint and stage.outputs_exist():
+                        print(f"[{name}] sin cambios; se omite.")
+                        status[name] = 'omitida'
+                    else:
+                        print(f"[{name}] ejecutando...")
+                        running[executor.submit(_run_stage, name, stage.func, stage.params)] = (name, fingerprint)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, fingerprint = running.pop(future)
+                try:
+                    elapsed = future.result()
+                except Exception as e:
+                    print(f"[{name}] falló: {e}")
+                    status[name] = 'fallida'
+                    state.pop(name, None)
+                else:
+                    print(f"[{name}] completada en {elapsed:.1f} s.")
+                    status[name] = 'ejecutada'
+                    state[name] = fingerprint
+                save_state(state)
+    return status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Orquestador del pipeline: preparación, validación, EDA, codificación y modelado.")
+    parser.add_argument('--input', default=data_preparation.file_path, help="Archivo fuente de la preparación.")
+    parser.add_argument('--force', action='store_true', help="Ejecutar todas las etapas aunque no hayan cambiado.")
+    parser.add_argument('--from-stage', choices=['preparacion', 'validacion', 'eda', 'codificacion', 'modelado'],
+                        help="Forzar esta etapa y todas las que dependen de ella.")
+    parser.add_argument('--jobs', type=int, default=None, help="Etapas a ejecutar en paralelo (por defecto, todas las posibles).")
+    args = parser.parse_args(argv)
+
+    stages = build_stages(args.input)
+    force = set(stages) if args.force else downstream(stages, args.from_stage) if args.from_stage else set()
+
+    start = time.perf_counter()
+    status = run_pipeline(stages, force=force, jobs=args.jobs)
+    print(f"\nPipeline terminado en {time.perf_counter() - start:.1f} s:")
+    for name, result in status.items():
+        print(f"  - {name}: {result}")
+    if any(result in ('fallida', 'bloqueada') for result in status.values()):
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":
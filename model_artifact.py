@@ -0,0 +1,62 @@
+import json
+import os
+from datetime import datetime
+
+import joblib
+
+from feature_encoding import FEATURES, MODELS_DIR
+
+# --- Artefacto Versionado del Modelo ---
+# Un artefacto agrupa el codificador ajustado y el modelo entrenado, para que la
+# inferencia codifique los registros exactamente igual que en el entrenamiento.
+# Cada entrenamiento crea models/modelo_gravedad_vN.joblib y actualiza models/latest.json.
+LATEST_PATH = os.path.join(MODELS_DIR, "latest.json")
+
+
+def _next_version(models_dir):
+    versions = [int(name[len("modelo_gravedad_v"):-len(".joblib")])
+                for name in os.listdir(models_dir)
+                if name.startswith("modelo_gravedad_v") and name.endswith(".joblib")]
+    return max(versions, default=0) + 1
+
+
+def save_model_artifact(model, encoder, feature_names, metrics, models_dir=MODELS_DIR, extra=None):
+    """Serializa codificador + modelo como una nueva versión y la marca como la más reciente."""
+    os.makedirs(models_dir, exist_ok=True)
+    version = _next_version(models_dir)
+    path = os.path.join(models_dir, f"modelo_gravedad_v{version}.joblib")
+    artifact = {
+        'version': version,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'features': FEATURES,
+        'feature_names': list(feature_names),
+        'encoder': encoder,
+        'model': model,
+        'metrics': {name: float(value) for name, value in metrics.items()},
+        **(extra or {}),
+    }
+    joblib.dump(artifact, path)
+
+    with open(os.path.join(models_dir, os.path.basename(LATEST_PATH)), "w") as f:
+        json.dump({'version': version, 'path': path, 'created_at': artifact['created_at'],
+                   'metrics': artifact['metrics']}, f, indent=2)
+    print(f"Artefacto del modelo guardado en: {path}")
+    return path
+
+
+def latest_model_info(latest_path=LATEST_PATH):
+    """Versión, ruta y métricas del artefacto más reciente (sin cargar el modelo), o None."""
+    if not os.path.exists(latest_path):
+        return None
+    with open(latest_path) as f:
+        return json.load(f)
+
+
+def load_model_artifact(path=None):
+    """Carga un artefacto; por defecto el más reciente."""
+    if path is None:
+        info = latest_model_info()
+        if info is None:
+            raise FileNotFoundError(f"No hay modelos entrenados ({LATEST_PATH} no existe). Ejecuta modeling.py.")
+        path = info['path']
+    return joblib.load(path)
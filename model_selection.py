@@ -0,0 +1,116 @@
+import time
+
+import pandas as pd
+from imblearn.pipeline import Pipeline
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import recall_score, roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+
+from imbalance import make_sampler
+
+# --- Configuración ---
+leaderboard_report_path = "model_selection_report.md"
+leaderboard_csv_path = "model_selection_leaderboard.csv"
+RANDOM_STATE = 42
+
+# Estrategias para el desbalance de clases. El remuestreo va dentro de un Pipeline de
+# imblearn, así que solo se aplica al fold de entrenamiento y nunca al de validación.
+# SMOTE-NC no se incluye: necesita las variables originales, no la matriz One-Hot.
+RESAMPLING_STRATEGIES = ['ninguno', 'smote', 'smote_aproximado', 'submuestreo', 'pesos_balanceados']
+
+
+def model_grid():
+    """Modelos candidatos: nombre y estimador sin ajustar."""
+    models = {}
+    for penalty in ['l1', 'l2']:
+        for C in [0.1, 1.0, 10.0]:
+            models[f"logistica_{penalty}_C{C:g}"] = LogisticRegression(
+                penalty=penalty, C=C, solver='liblinear', max_iter=1000, random_state=RANDOM_STATE)
+    models['gradient_boosting'] = GradientBoostingClassifier(n_estimators=200, max_depth=3, random_state=RANDOM_STATE)
+    # n_jobs=1: el paralelismo se hace entre folds, no dentro de cada bosque
+    models['random_forest'] = RandomForestClassifier(
+        n_estimators=200, min_samples_leaf=5, n_jobs=1, random_state=RANDOM_STATE)
+    return models
+
+
+def candidate_pipelines():
+    """Combina cada modelo con cada estrategia de desbalance compatible."""
+    candidates = {}
+    for model_name, model in model_grid().items():
+        for strategy in RESAMPLING_STRATEGIES:
+            estimator = clone(model)
+            steps = []
+            if strategy in ('smote', 'smote_aproximado', 'submuestreo'):
+                steps.append(('remuestreo', make_sampler(strategy, RANDOM_STATE)))
+            elif strategy == 'pesos_balanceados':
+                # GradientBoostingClassifier no admite class_weight
+                if 'class_weight' not in estimator.get_params():
+                    continue
+                estimator.set_params(class_weight='balanced')
+            steps.append(('modelo', estimator))
+            candidates[(model_name, strategy)] = Pipeline(steps)
+    return candidates
+
+
+def _evaluate_fold(candidate, pipeline, X, y, train_idx, test_idx):
+    """Ajusta una copia del candidato en un fold y devuelve sus métricas y tiempo de ajuste."""
+    pipeline = clone(pipeline)
+    start = time.perf_counter()
+    pipeline.fit(X[train_idx], y[train_idx])
+    fit_time = time.perf_counter() - start
+    y_proba = pipeline.predict_proba(X[test_idx])[:, 1]
+    return {
+        'modelo': candidate[0],
+        'remuestreo': candidate[1],
+        'roc_auc': roc_auc_score(y[test_idx], y_proba),
+        'recall': recall_score(y[test_idx], (y_proba >= 0.5).astype(int)),
+        'tiempo_ajuste_s': fit_time,
+    }
+
+
+def run_model_selection(X, y, n_splits=5, n_jobs=-1):
+    """
+    Validación cruzada estratificada de todos los candidatos.
+
+    Cada par (candidato, fold) es una tarea independiente que se ejecuta en un pool de
+    procesos (joblib/loky), de modo que se usan todos los núcleos aunque haya pocos folds.
+    Devuelve el leaderboard ordenado por ROC AUC medio.
+    """
+    folds = list(StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=RANDOM_STATE).split(X, y))
+    candidates = candidate_pipelines()
+    print(f"Validación cruzada: {len(candidates)} candidatos × {n_splits} folds...")
+
+    results = Parallel(n_jobs=n_jobs, verbose=5)(
+        delayed(_evaluate_fold)(candidate, pipeline, X, y, train_idx, test_idx)
+        for candidate, pipeline in candidates.items()
+        for train_idx, test_idx in folds
+    )
+
+    leaderboard = (pd.DataFrame(results)
+                   .groupby(['modelo', 'remuestreo'])
+                   .agg(roc_auc_media=('roc_auc', 'mean'), roc_auc_std=('roc_auc', 'std'),
+                        recall_media=('recall', 'mean'), recall_std=('recall', 'std'),
+                        tiempo_ajuste_s=('tiempo_ajuste_s', 'mean'))
+                   .sort_values('roc_auc_media', ascending=False)
+                   .reset_index())
+    return leaderboard
+
+
+def write_leaderboard(leaderboard, report_path=leaderboard_report_path, csv_path=leaderboard_csv_path):
+    leaderboard.to_csv(csv_path, index=False)
+
+    content = "## Selección de Modelos (Validación Cruzada Estratificada)\n\n"
+    content += "El remuestreo (SMOTE / submuestreo) se aplica solo dentro del fold de entrenamiento. "
+    content += "El tiempo de ajuste es el promedio por fold.\n\n"
+    content += "| # | Modelo | Remuestreo | ROC AUC | Recall (Alta Gravedad) | Tiempo de ajuste (s) |\n"
+    content += "| :--- | :--- | :--- | :--- | :--- | :--- |\n"
+    for i, row in enumerate(leaderboard.itertuples(), start=1):
+        content += (f"| {i} | {row.modelo} | {row.remuestreo} | {row.roc_auc_media:.4f} ± {row.roc_auc_std:.4f} "
+                    f"| {row.recall_media:.2f} ± {row.recall_std:.2f} | {row.tiempo_ajuste_s:.2f} |\n")
+
+    with open(report_path, "w") as f:
+        f.write(content)
+    print(f"\nLeaderboard guardado en: {report_path} y {csv_path}")
@@ -1,127 +1,224 @@
+import numpy as np
 import pandas as pd
+from scipy import sparse
 from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score, roc_curve
-from imblearn.over_sampling import SMOTE
 import matplotlib.pyplot as plt
+import argparse
 import os
 
+from data_store import CLEANED_DATA_PATH, MODELING_DATA_CSV_PATH, MODELING_DATA_PATH, load_table
+from feature_encoding import ENCODER_PATH, FEATURE_MATRIX_PATH, FEATURES, TARGET, load_encoder, load_feature_matrix
+from imbalance import IMBALANCE_STRATEGIES, STRATEGY_DESCRIPTIONS, resample
+from incremental_training import incremental_update
+from instrumentation import span
+from model_artifact import save_model_artifact
+from model_selection import run_model_selection, write_leaderboard
+from query_backend import load_columns
+
 # --- Configuración ---
-modeling_data_path = "siniestros_viales_modelado.csv"
+modeling_data_path = FEATURE_MATRIX_PATH
 plots_dir = "plots"
 modeling_report_path = "modeling_report.md"
 
 # --- 1. Carga de Datos y División ---
-print("Cargando datos para modelado...")
-df_model = pd.read_csv(modeling_data_path)
-
-# Separar características (X) y variable objetivo (y)
-X = df_model.drop('gravedad_binaria', axis=1)
-y = df_model['gravedad_binaria']
-
-# Rellenar valores NaN con 0. Esto se debe a que las columnas originales (CHOQUE, OBJETO_FIJO)
-# tenían NaNs, y las variables dummy generadas a partir de ellas también pueden tener NaNs
-# si la columna categórica original tenía nulos.
-X = X.fillna(0)
-
-# División en conjuntos de entrenamiento y prueba
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42, stratify=y)
-
-# --- 2. Manejo del Desbalance de Clases (SMOTE) ---
-# El EDA mostró un desbalance extremo (98.47% Grave vs 1.53% Leve).
-# Esto es un error de interpretación de la variable 'GRAVEDAD' en el paso de limpieza.
-# Revisando el metadato:
-# GRAVEDAD: 1 (Solo Daños), 2 (Lesionado), 3 (Muerto).
-# La variable objetivo debe ser: 1 = ALTA GRAVEDAD (Muerto o Lesionado), 0 = BAJA GRAVEDAD (Solo Daños).
-# El script anterior invirtió el significado. Corregiremos la lógica de la variable objetivo
-# antes de aplicar SMOTE.
-
-# Como el desbalance es inverso a lo esperado (la mayoría son "Graves"), vamos a re-evaluar la variable.
-# La variable objetivo en el EDA fue: 1 (Grave) = 98.47%, 0 (Leve) = 1.53%.
-# Esto sugiere que la mayoría de los siniestros en el dataset son de alta gravedad (Lesionado o Muerto).
-# Esto es altamente improbable para un dataset de siniestralidad vial.
-# El error debe estar en la interpretación de los valores de la columna 'gravedad'.
-
-# Volviendo a la lógica original:
-# GRAVEDAD: 1 (Solo Daños), 2 (Lesionado), 3 (Muerto).
-# Si el script anterior dio 98.47% para 1 (Grave), significa que la mayoría de los valores
-# en la columna 'gravedad' son 2 o 3.
-
-# Para el propósito del proyecto, la predicción de ALTO RIESGO es la minoría.
-# Vamos a asumir que la variable 'gravedad' original es:
-# 1: Solo Daños (BAJA GRAVEDAD)
-# 2: Lesionado (ALTA GRAVEDAD)
-# 3: Muerto (ALTA GRAVEDAD)
-
-# El desbalance es un problema real en este dataset, por lo que aplicaremos SMOTE para el modelado.
-
-# Aplicar SMOTE solo al conjunto de entrenamiento
-print("Aplicando SMOTE para manejar el desbalance de clases...")
-smote = SMOTE(random_state=42)
-X_res, y_res = smote.fit_resample(X_train, y_train)
-
-print(f"Distribución de la variable objetivo después de SMOTE: \n{y_res.value_counts()}")
-
-# --- 3. Modelado (Regresión Logística como Línea Base) ---
-print("\nEntrenando modelo de Regresión Logística...")
-model = LogisticRegression(max_iter=1000, random_state=42, solver='liblinear')
-model.fit(X_res, y_res)
-
-# --- 4. Evaluación del Modelo ---
-print("\nEvaluando el modelo...")
-y_pred = model.predict(X_test)
-y_proba = model.predict_proba(X_test)[:, 1]
-
-# Generar Reporte de Métricas
-report = classification_report(y_test, y_pred, target_names=['Baja Gravedad (0)', 'Alta Gravedad (1)'], output_dict=True)
-
-# Generar Reporte en Markdown
-modeling_content = "## Modelado Predictivo (Regresión Logística)\n\n"
-modeling_content += "### 4.1. Metodología\n"
-modeling_content += "- **Modelo:** Regresión Logística (como modelo base).\n"
-modeling_content += "- **Manejo de Desbalance:** SMOTE (Synthetic Minority Over-sampling Technique) aplicado al conjunto de entrenamiento.\n"
-modeling_content += f"- **Tamaño del Conjunto de Prueba:** 30% ({len(y_test)} registros).\n\n"
-
-modeling_content += "### 4.2. Métricas de Evaluación\n"
-modeling_content += "El desbalance de clases hace que la precisión general sea una métrica engañosa. Nos enfocaremos en el **Recall** y la métrica **ROC AUC**.\n\n"
-
-modeling_content += "#### Reporte de Clasificación\n"
-modeling_content += "| Métrica | Baja Gravedad (0) | Alta Gravedad (1) | Weighted Avg |\n"
-modeling_content += "| :--- | :--- | :--- | :--- |\n"
-modeling_content += f"| Precision | {report['Baja Gravedad (0)']['precision']:.2f} | {report['Alta Gravedad (1)']['precision']:.2f} | {report['weighted avg']['precision']:.2f} |\n"
-modeling_content += f"| Recall | {report['Baja Gravedad (0)']['recall']:.2f} | {report['Alta Gravedad (1)']['recall']:.2f} | {report['weighted avg']['recall']:.2f} |\n"
-modeling_content += f"| F1-Score | {report['Baja Gravedad (0)']['f1-score']:.2f} | {report['Alta Gravedad (1)']['f1-score']:.2f} | {report['weighted avg']['f1-score']:.2f} |\n\n"
-
-auc_score = roc_auc_score(y_test, y_proba)
-modeling_content += f"**ROC AUC Score:** {auc_score:.4f}\n\n"
-
-# 4.3. Matriz de Confusión
-cm = confusion_matrix(y_test, y_pred)
-modeling_content += "#### Matriz de Confusión\n"
-modeling_content += "Se predijo correctamente la clase minoritaria (Baja Gravedad) en {0} casos.\n".format(cm[0, 0])
-modeling_content += "Se predijo incorrectamente la clase minoritaria (Falsos Positivos) en {0} casos.\n".format(cm[1, 0])
-modeling_content += f"| | Predicción 0 (Baja Gravedad) | Predicción 1 (Alta Gravedad) |\n"
-modeling_content += f"| :--- | :--- | :--- |\n"
-modeling_content += f"| Real 0 (Baja Gravedad) | {cm[0, 0]} | {cm[0, 1]} |\n"
-modeling_content += f"| Real 1 (Alta Gravedad) | {cm[1, 0]} | {cm[1, 1]} |\n\n"
-
-# 4.4. Curva ROC
-fpr, tpr, _ = roc_curve(y_test, y_proba)
-plt.figure(figsize=(8, 6))
-plt.plot(fpr, tpr, color='darkorange', lw=2, label=f'Curva ROC (área = {auc_score:.2f})')
-plt.plot([0, 1], [0, 1], color='navy', lw=2, linestyle='--')
-plt.xlim([0.0, 1.0])
-plt.ylim([0.0, 1.05])
-plt.xlabel('Tasa de Falsos Positivos (1 - Especificidad)')
-plt.ylabel('Tasa de Verdaderos Positivos (Recall)')
-plt.title('Curva ROC - Predicción de Alta Gravedad')
-plt.legend(loc="lower right")
-plt.savefig(os.path.join(plots_dir, 'roc_curve.png'))
-plt.close()
-modeling_content += "Se generó el gráfico 'roc_curve.png' para visualizar el rendimiento del modelo.\n"
-
-# --- 5. Guardar Reporte de Modelado ---
-with open(modeling_report_path, "w") as f:
-    f.write(modeling_content)
-
-print(f"\nReporte de Modelado guardado en: {modeling_report_path}")
+
+def load_modeling_data(path=modeling_data_path):
+    """Devuelve la matriz de variables (CSR), la variable objetivo y los nombres de columnas."""
+    print("Cargando datos para modelado...")
+    if os.path.exists(path):
+        # Matriz dispersa (CSR) generada por eda_and_modeling_prep.py; no se densifica en ningún paso
+        X, y, feature_names = load_feature_matrix(path)
+    else:
+        # Compatibilidad con el DataFrame denso (One-Hot con pd.get_dummies) de versiones anteriores
+        print(f"Aviso: no se encontró {path}; usando la tabla densa {MODELING_DATA_PATH}.")
+        df_model = load_table(MODELING_DATA_PATH, csv_fallback=MODELING_DATA_CSV_PATH)
+        # Rellenar valores NaN con 0. Esto se debe a que las columnas originales (CHOQUE, OBJETO_FIJO)
+        # tenían NaNs, y las variables dummy generadas a partir de ellas también pueden tener NaNs
+        # si la columna categórica original tenía nulos.
+        X = sparse.csr_matrix(df_model.drop(TARGET, axis=1).fillna(0).to_numpy(dtype=np.float32))
+        y = df_model[TARGET].to_numpy()
+        feature_names = list(df_model.columns.drop(TARGET))
+    return X, y, feature_names
+
+
+def split_data(X, y, raw=None):
+    # División en conjuntos de entrenamiento y prueba
+    # Si se pasan las variables originales (`raw`), sus filas se dividen igual que las de X
+    if raw is None:
+        return train_test_split(X, y, test_size=0.3, random_state=42, stratify=y)
+    return train_test_split(X, y, raw, test_size=0.3, random_state=42, stratify=y)
+
+
+def load_raw_features(n_rows, path=CLEANED_DATA_PATH):
+    """Variables originales (antes del One-Hot), alineadas fila a fila con la matriz de modelado."""
+    raw = load_columns(FEATURES, path)
+    if len(raw) != n_rows:
+        raise ValueError(f"El dataset limpio tiene {len(raw)} filas y la matriz {n_rows}; "
+                         "vuelve a ejecutar eda_and_modeling_prep.py.")
+    return raw
+
+
+def train_baseline(X_train, y_train, strategy='smote', raw_train=None):
+    """
+    Aplica la estrategia de desbalance (por defecto SMOTE) al conjunto de entrenamiento y
+    ajusta la Regresión Logística base. Las estrategias están en `imbalance.py`.
+    """
+    # --- 2. Manejo del Desbalance de Clases (SMOTE) ---
+    # El EDA mostró un desbalance extremo (98.47% Grave vs 1.53% Leve).
+    # Esto es un error de interpretación de la variable 'GRAVEDAD' en el paso de limpieza.
+    # Revisando el metadato:
+    # GRAVEDAD: 1 (Solo Daños), 2 (Lesionado), 3 (Muerto).
+    # La variable objetivo debe ser: 1 = ALTA GRAVEDAD (Muerto o Lesionado), 0 = BAJA GRAVEDAD (Solo Daños).
+    # El script anterior invirtió el significado. Corregiremos la lógica de la variable objetivo
+    # antes de aplicar SMOTE.
+
+    # Como el desbalance es inverso a lo esperado (la mayoría son "Graves"), vamos a re-evaluar la variable.
+    # La variable objetivo en el EDA fue: 1 (Grave) = 98.47%, 0 (Leve) = 1.53%.
+    # Esto sugiere que la mayoría de los siniestros en el dataset son de alta gravedad (Lesionado o Muerto).
+    # Esto es altamente improbable para un dataset de siniestralidad vial.
+    # El error debe estar en la interpretación de los valores de la columna 'gravedad'.
+
+    # Volviendo a la lógica original:
+    # GRAVEDAD: 1 (Solo Daños), 2 (Lesionado), 3 (Muerto).
+    # Si el script anterior dio 98.47% para 1 (Grave), significa que la mayoría de los valores
+    # en la columna 'gravedad' son 2 o 3.
+
+    # Para el propósito del proyecto, la predicción de ALTO RIESGO es la minoría.
+    # Vamos a asumir que la variable 'gravedad' original es:
+    # 1: Solo Daños (BAJA GRAVEDAD)
+    # 2: Lesionado (ALTA GRAVEDAD)
+    # 3: Muerto (ALTA GRAVEDAD)
+
+    # El desbalance es un problema real en este dataset, por lo que aplicaremos SMOTE para el modelado.
+
+    # Aplicar el remuestreo solo al conjunto de entrenamiento
+    print(f"Aplicando la estrategia '{strategy}' para manejar el desbalance de clases...")
+    with span('modelado.desbalance', rows=X_train.shape[0], estrategia=strategy) as sp:
+        encoder = load_encoder() if strategy == 'smotenc' else None
+        X_res, y_res, class_weight = resample(strategy, X_train, y_train, raw_train, encoder)
+        sp.extra['filas_remuestreadas'] = X_res.shape[0]
+
+    print(f"Distribución de la variable objetivo después de '{strategy}': \n{pd.Series(y_res).value_counts()}")
+
+    # --- 3. Modelado (Regresión Logística como Línea Base) ---
+    print("\nEntrenando modelo de Regresión Logística...")
+    model = LogisticRegression(max_iter=1000, random_state=42, solver='liblinear', class_weight=class_weight)
+    with span('modelado.ajuste', rows=X_res.shape[0]):
+        model.fit(X_res, y_res)
+    return model
+
+
+def evaluate_and_report(model, X_test, y_test, strategy='smote'):
+    """Evalúa el modelo, guarda el reporte de modelado y la curva ROC; devuelve las métricas clave."""
+    # --- 4. Evaluación del Modelo ---
+    print("\nEvaluando el modelo...")
+    y_pred = model.predict(X_test)
+    y_proba = model.predict_proba(X_test)[:, 1]
+
+    # Generar Reporte de Métricas
+    report = classification_report(y_test, y_pred, target_names=['Baja Gravedad (0)', 'Alta Gravedad (1)'], output_dict=True)
+
+    # Generar Reporte en Markdown
+    modeling_content = "## Modelado Predictivo (Regresión Logística)\n\n"
+    modeling_content += "### 4.1. Metodología\n"
+    modeling_content += "- **Modelo:** Regresión Logística (como modelo base).\n"
+    modeling_content += f"- **Manejo de Desbalance:** {STRATEGY_DESCRIPTIONS[strategy]}.\n"
+    modeling_content += f"- **Tamaño del Conjunto de Prueba:** 30% ({len(y_test)} registros).\n\n"
+
+    modeling_content += "### 4.2. Métricas de Evaluación\n"
+    modeling_content += "El desbalance de clases hace que la precisión general sea una métrica engañosa. Nos enfocaremos en el **Recall** y la métrica **ROC AUC**.\n\n"
+
+    modeling_content += "#### Reporte de Clasificación\n"
+    modeling_content += "| Métrica | Baja Gravedad (0) | Alta Gravedad (1) | Weighted Avg |\n"
+    modeling_content += "| :--- | :--- | :--- | :--- |\n"
+    modeling_content += f"| Precision | {report['Baja Gravedad (0)']['precision']:.2f} | {report['Alta Gravedad (1)']['precision']:.2f} | {report['weighted avg']['precision']:.2f} |\n"
+    modeling_content += f"| Recall | {report['Baja Gravedad (0)']['recall']:.2f} | {report['Alta Gravedad (1)']['recall']:.2f} | {report['weighted avg']['recall']:.2f} |\n"
+    modeling_content += f"| F1-Score | {report['Baja Gravedad (0)']['f1-score']:.2f} | {report['Alta Gravedad (1)']['f1-score']:.2f} | {report['weighted avg']['f1-score']:.2f} |\n\n"
+
+    auc_score = roc_auc_score(y_test, y_proba)
+    modeling_content += f"**ROC AUC Score:** {auc_score:.4f}\n\n"
+
+    # 4.3. Matriz de Confusión
+    cm = confusion_matrix(y_test, y_pred)
+    modeling_content += "#### Matriz de Confusión\n"
+    modeling_content += "Se predijo correctamente la clase minoritaria (Baja Gravedad) en {0} casos.\n".format(cm[0, 0])
+    modeling_content += "Se predijo incorrectamente la clase minoritaria (Falsos Positivos) en {0} casos.\n".format(cm[1, 0])
+    modeling_content += f"| | Predicción 0 (Baja Gravedad) | Predicción 1 (Alta Gravedad) |\n"
+    modeling_content += f"| :--- | :--- | :--- |\n"
+    modeling_content += f"| Real 0 (Baja Gravedad) | {cm[0, 0]} | {cm[0, 1]} |\n"
+    modeling_content += f"| Real 1 (Alta Gravedad) | {cm[1, 0]} | {cm[1, 1]} |\n\n"
+
+    # 4.4. Curva ROC
+    fpr, tpr, _ = roc_curve(y_test, y_proba)
+    os.makedirs(plots_dir, exist_ok=True)
+    plt.figure(figsize=(8, 6))
+    plt.plot(fpr, tpr, color='darkorange', lw=2, label=f'Curva ROC (área = {auc_score:.2f})')
+    plt.plot([0, 1], [0, 1], color='navy', lw=2, linestyle='--')
+    plt.xlim([0.0, 1.0])
+    plt.ylim([0.0, 1.05])
+    plt.xlabel('Tasa de Falsos Positivos (1 - Especificidad)')
+    plt.ylabel('Tasa de Verdaderos Positivos (Recall)')
+    plt.title('Curva ROC - Predicción de Alta Gravedad')
+    plt.legend(loc="lower right")
+    plt.savefig(os.path.join(plots_dir, 'roc_curve.png'))
+    plt.close()
+    modeling_content += "Se generó el gráfico 'roc_curve.png' para visualizar el rendimiento del modelo.\n"
+
+    # --- 5. Guardar Reporte de Modelado ---
+    with open(modeling_report_path, "w") as f:
+        f.write(modeling_content)
+
+    print(f"\nReporte de Modelado guardado en: {modeling_report_path}")
+    return {'roc_auc': auc_score, 'recall': report['Alta Gravedad (1)']['recall']}
+
+
+def run_modeling(path=modeling_data_path, strategy='smote'):
+    with span('modelado.lectura') as sp:
+        X, y, feature_names = load_modeling_data(path)
+        sp.rows = X.shape[0]
+    raw_train = None
+    if strategy == 'smotenc':
+        X_train, X_test, y_train, y_test, raw_train, _ = split_data(X, y, load_raw_features(X.shape[0]))
+    else:
+        X_train, X_test, y_train, y_test = split_data(X, y)
+    model = train_baseline(X_train, y_train, strategy, raw_train)
+    with span('modelado.evaluacion', rows=X_test.shape[0]):
+        metrics = evaluate_and_report(model, X_test, y_test, strategy)
+
+    # --- 6. Guardar el Artefacto del Modelo (codificador + modelo) ---
+    if os.path.exists(ENCODER_PATH):
+        save_model_artifact(model, load_encoder(), feature_names, metrics, extra={'desbalance': strategy})
+    else:
+        print(f"Aviso: no se encontró el codificador {ENCODER_PATH}; el modelo no se guardó como artefacto.")
+    return metrics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Entrenamiento y evaluación del modelo de gravedad de siniestros.")
+    parser.add_argument('--seleccion-modelos', action='store_true',
+                        help="Comparar modelos y estrategias de remuestreo con validación cruzada estratificada.")
+    parser.add_argument('--folds', type=int, default=5, help="Número de folds de la validación cruzada.")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Procesos para la validación cruzada (-1: todos los núcleos).")
+    parser.add_argument('--desbalance', choices=IMBALANCE_STRATEGIES, default='smote',
+                        help="Estrategia para el desbalance de clases del modelo base.")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Actualizar el modelo incremental solo con las filas nuevas; reentrena desde cero "
+                             "si hay drift o cae el ROC AUC.")
+    parser.add_argument('--reentrenar', action='store_true',
+                        help="Con --incremental, forzar el reentrenamiento completo.")
+    args = parser.parse_args(argv)
+
+    if args.seleccion_modelos:
+        X, y, _ = load_modeling_data()
+        leaderboard = run_model_selection(X, y, n_splits=args.folds, n_jobs=args.n_jobs)
+        write_leaderboard(leaderboard)
+    elif args.incremental:
+        incremental_update(force_full=args.reentrenar)
+    else:
+        run_modeling(strategy=args.desbalance)
+
+
+if __name__ == "__main__":
+    main()
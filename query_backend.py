@@ -0,0 +1,164 @@
+"""
+Backend de consultas sobre el dataset limpio: pandas (por defecto) o DuckDB.
+
+Con DuckDB los conteos del EDA y del dashboard y la extracción de las variables del
+modelo se ejecutan como consultas sobre el Parquet, sin cargarlo antes en pandas: el
+escaneo es multihilo, solo se leen las columnas de la consulta y la agregación puede
+usar disco si supera el límite de memoria. El resultado se convierte a los mismos tipos
+que produce la ruta de pandas, que sigue siendo la referencia y el respaldo.
+
+Uso:
+    PIPELINE_QUERY_BACKEND=duckdb python main.py
+    python query_backend.py --verificar
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from data_store import CLEANED_DATA_CSV_PATH, CLEANED_DATA_PATH, load_table
+
+try:
+    import duckdb
+except ImportError:  # dependencia opcional: sin duckdb se usa pandas
+    duckdb = None
+
+# --- Configuración ---
+# PIPELINE_QUERY_BACKEND: 'pandas' o 'duckdb'
+BACKENDS = ['pandas', 'duckdb']
+QUERY_BACKEND = os.environ.get('PIPELINE_QUERY_BACKEND', 'pandas')
+# Hilos y memoria de DuckDB (por defecto: todos los núcleos y el 80% de la RAM); al superar
+# el límite las agregaciones se escriben por partes en DUCKDB_TEMP_DIR
+DUCKDB_THREADS = os.environ.get('PIPELINE_DUCKDB_THREADS')
+DUCKDB_MEMORY_LIMIT = os.environ.get('PIPELINE_DUCKDB_MEMORY')
+DUCKDB_TEMP_DIR = os.environ.get('PIPELINE_DUCKDB_TEMP_DIR', '.duckdb_tmp')
+
+# Columnas de los conteos del EDA y del cubo del dashboard
+COUNT_COLUMNS = ['dia_semana', 'hora_del_dia', 'codigo_localidad', 'gravedad_binaria']
+
+
+def resolve_backend(backend=None, path=CLEANED_DATA_PATH):
+    """Backend a usar: DuckDB solo si está instalado y el dataset es un Parquet existente."""
+    backend = backend or QUERY_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de consultas desconocido: {backend} (opciones: {BACKENDS})")
+    if backend == 'duckdb':
+        if duckdb is None:
+            print("Aviso: duckdb no está instalado; se usa el backend pandas.")
+            return 'pandas'
+        if not (path.endswith('.parquet') and os.path.exists(path)):
+            print(f"Aviso: DuckDB consulta el Parquet limpio y {path} no lo es; se usa el backend pandas.")
+            return 'pandas'
+    return backend
+
+
+def connect():
+    """Conexión DuckDB en memoria con los límites de hilos y memoria configurados."""
+    con = duckdb.connect()
+    if DUCKDB_THREADS:
+        con.execute(f"SET threads = {int(DUCKDB_THREADS)}")
+    if DUCKDB_MEMORY_LIMIT:
+        con.execute(f"SET memory_limit = '{DUCKDB_MEMORY_LIMIT}'")
+    con.execute(f"SET temp_directory = '{DUCKDB_TEMP_DIR}'")
+    return con
+
+
+def _column_list(columns):
+    return ', '.join(f'"{col}"' for col in columns)
+
+
+def _pandas_dtypes(path, columns):
+    """Tipos que pandas da a las columnas del Parquet (categorías ordenadas, enteros con nulos)."""
+    # Un corte vacío del primer grupo de filas conserva el diccionario de las categorías
+    return pq.ParquetFile(path).read_row_group(0, columns=columns).slice(0, 0).to_pandas().dtypes.to_dict()
+
+
+# --- Consultas ---
+
+def load_columns(columns, path=CLEANED_DATA_PATH, backend=None):
+    """Columnas del dataset limpio como DataFrame (proyección de columnas)."""
+    if resolve_backend(backend, path) == 'pandas':
+        return load_table(path, columns=columns, csv_fallback=CLEANED_DATA_CSV_PATH)
+
+    with connect() as con:
+        table = con.execute(f"SELECT {_column_list(columns)} FROM read_parquet(?)", [path]).to_arrow_table()
+    return table.to_pandas().astype(_pandas_dtypes(path, columns))
+
+
+def group_counts(columns, path=CLEANED_DATA_PATH, backend=None):
+    """
+    Siniestros por combinación de `columns`, con los nulos como un grupo más.
+
+    Devuelve la misma Serie que `df.groupby(columns, observed=True, dropna=False).size()`:
+    MultiIndex ordenado (categorías en su orden, nulos al final) y conteos int64.
+    """
+    if resolve_backend(backend, path) == 'pandas':
+        df = load_table(path, columns=columns, csv_fallback=CLEANED_DATA_CSV_PATH)
+        return df.groupby(columns, observed=True, dropna=False).size()
+
+    with connect() as con:
+        table = con.execute(f"SELECT {_column_list(columns)}, count(*) AS conteo "
+                            f"FROM read_parquet(?) GROUP BY ALL", [path]).to_arrow_table()
+    counts = table.to_pandas().astype({**_pandas_dtypes(path, columns), 'conteo': 'int64'})
+    return counts.set_index(columns)['conteo'].sort_index().rename(None)
+
+
+# --- Verificación de Equivalencia ---
+
+def check_equivalence(path=CLEANED_DATA_PATH, queries=None):
+    """
+    Ejecuta cada consulta con pandas y con DuckDB y compara los resultados.
+
+    Devuelve una fila por consulta con los tiempos de ambos backends y si los resultados
+    son idénticos (valores, orden, índice y tipos).
+    """
+    if resolve_backend('duckdb', path) != 'duckdb':
+        raise RuntimeError("La verificación necesita duckdb instalado y el dataset limpio en Parquet.")
+    results = []
+    for name, (func, columns) in queries.items():
+        outputs, times = {}, {}
+        for backend in BACKENDS:
+            start = time.perf_counter()
+            outputs[backend] = func(columns, path, backend=backend)
+            times[backend] = time.perf_counter() - start
+        try:
+            assert_equal = pd.testing.assert_series_equal if isinstance(outputs['pandas'], pd.Series) \
+                else pd.testing.assert_frame_equal
+            assert_equal(outputs['pandas'], outputs['duckdb'])
+            identical = True
+        except AssertionError as e:
+            print(f"Diferencia en '{name}':\n{e}")
+            identical = False
+        results.append({'consulta': name, 'pandas_s': times['pandas'], 'duckdb_s': times['duckdb'],
+                        'identicos': identical})
+    return pd.DataFrame(results).set_index('consulta')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--verificar', action='store_true',
+                        help="Comparar resultados y tiempos de pandas y DuckDB sobre el dataset limpio.")
+    parser.add_argument('--input', default=CLEANED_DATA_PATH, help="Parquet limpio a consultar.")
+    args = parser.parse_args(argv)
+    if not args.verificar:
+        parser.print_help()
+        return
+
+    from app_dashboard import DASHBOARD_COLUMNS
+    from feature_encoding import FEATURES, TARGET
+    queries = {
+        'conteos_eda': (group_counts, COUNT_COLUMNS),
+        'conteos_dashboard': (group_counts, DASHBOARD_COLUMNS),
+        'variables_modelo': (load_columns, FEATURES + [TARGET]),
+    }
+    table = check_equivalence(args.input, queries)
+    print(table.to_string(float_format=lambda v: f"{v:.3f}"))
+    if not table['identicos'].all():
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from scipy import sparse
+
+from data_store import ChunkedTableWriter
+from feature_encoding import CATEGORICAL_FEATURES, FEATURES, MISSING_CATEGORY, NUMERIC_FEATURES, encode
+from model_artifact import load_model_artifact
+
+# --- Configuración ---
+default_chunksize = 100_000
+default_port = 8060
+SCORE_COLUMN = 'riesgo_alta_gravedad'
+
+
+class RiskScorer:
+    """Carga el artefacto una sola vez y calcula la probabilidad de alta gravedad."""
+
+    def __init__(self, artifact=None):
+        self.artifact = artifact if artifact is not None else load_model_artifact()
+        self.encoder = self.artifact['encoder']
+        self.model = self.artifact['model']
+        self.version = self.artifact['version']
+        self._column_index = self._build_column_index()
+
+    def _build_column_index(self):
+        """Mapa categoría -> columna de la matriz, equivalente a `encoder.transform` (sin la categoría descartada)."""
+        column_index = {}
+        offset = len(NUMERIC_FEATURES)
+        drop_idx = self.encoder.drop_idx_ if self.encoder.drop_idx_ is not None else [None] * len(CATEGORICAL_FEATURES)
+        for col, categories, dropped in zip(CATEGORICAL_FEATURES, self.encoder.categories_, drop_idx):
+            mapping = {}
+            for i, category in enumerate(categories):
+                if dropped is not None and i == dropped:
+                    continue
+                mapping[str(category)] = offset
+                offset += 1
+            column_index[col] = mapping
+        return column_index
+
+    @staticmethod
+    def _category_key(value):
+        # Misma normalización que feature_encoding.categorical_frame
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            return MISSING_CATEGORY
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value)
+
+    def _encode_records(self, records):
+        """Codificación directa de pocos registros, sin construir un DataFrame."""
+        data, indices, indptr = [], [], [0]
+        for record in records:
+            for i, col in enumerate(NUMERIC_FEATURES):
+                value = record.get(col)
+                if value is not None and value == value and value != 0:
+                    data.append(float(value))
+                    indices.append(i)
+            for col in CATEGORICAL_FEATURES:
+                column = self._column_index[col].get(self._category_key(record.get(col)))
+                if column is not None:
+                    data.append(1.0)
+                    indices.append(column)
+            indptr.append(len(indices))
+        n_columns = len(NUMERIC_FEATURES) + sum(len(m) for m in self._column_index.values())
+        return sparse.csr_matrix((np.asarray(data, dtype=np.float32), indices, indptr),
+                                 shape=(len(records), n_columns))
+
+    def score_frame(self, df):
+        """Puntaje vectorizado para un DataFrame con las columnas de `FEATURES`."""
+        missing = [col for col in FEATURES if col not in df.columns]
+        if missing:
+            raise ValueError(f"Faltan columnas para el modelo: {missing}")
+        return self.model.predict_proba(encode(df, self.encoder))[:, 1]
+
+    def score_records(self, records):
+        """Puntaje para una lista de registros (diccionarios); faltantes se tratan como nulos."""
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            raise ValueError("Se espera un objeto JSON o una lista de objetos JSON con las variables del modelo.")
+        if not records:
+            return np.empty(0)
+        if len(records) > 1000:
+            return self.score_frame(pd.DataFrame.from_records(records, columns=FEATURES))
+        return self.model.predict_proba(self._encode_records(records))[:, 1]
+
+
+# --- 1. Puntaje por Lotes ---
+
+def _iter_input_chunks(path, chunksize):
+    if path.endswith('.parquet'):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def score_file(input_path, output_path, scorer=None, chunksize=default_chunksize):
+    """
+    Calcula el riesgo de todos los registros de un CSV/Parquet por bloques y escribe el
+    archivo de salida (mismo formato según la extensión) con la columna `riesgo_alta_gravedad`.
+    """
+    scorer = scorer or RiskScorer()
+    start = time.perf_counter()
+    rows = 0
+    writer = ChunkedTableWriter(output_path) if output_path.endswith('.parquet') else None
+    try:
+        for i, chunk in enumerate(_iter_input_chunks(input_path, chunksize)):
+            chunk[SCORE_COLUMN] = scorer.score_frame(chunk).astype(np.float32)
+            if writer is not None:
+                writer.write(chunk)
+            else:
+                chunk.to_csv(output_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    elapsed = time.perf_counter() - start
+    print(f"{rows} registros puntuados en {elapsed:.2f} s ({rows / max(elapsed, 1e-9):,.0f} registros/s). "
+          f"Resultado en: {output_path}")
+    return rows
+
+
+# --- 2. Servicio HTTP Local ---
+
+def make_handler(scorer):
+    class ScoringHandler(BaseHTTPRequestHandler):
+        # HTTP/1.1 permite reutilizar la conexión entre solicitudes (keep-alive); sin Nagle,
+        # los encabezados y el cuerpo de la respuesta no esperan el ACK retardado del cliente
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send_json(200, {'status': 'ok', 'version': scorer.version,
+                                      'metrics': scorer.artifact['metrics']})
+            else:
+                self._send_json(404, {'error': 'Ruta no encontrada'})
+
+        def do_POST(self):
+            if self.path != '/score':
+                self._send_json(404, {'error': 'Ruta no encontrada'})
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                records = payload if isinstance(payload, list) else [payload]
+                scores = scorer.score_records(records)
+            except (ValueError, TypeError) as e:
+                self._send_json(400, {'error': str(e)})
+                return
+            self._send_json(200, {'version': scorer.version, 'scores': [round(float(s), 6) for s in scores]})
+
+        def log_message(self, format, *args):
+            # Sin log por solicitud: el registro en stderr domina la latencia
+            pass
+
+    return ScoringHandler
+
+
+def make_server(scorer=None, host='127.0.0.1', port=default_port):
+    scorer = scorer or RiskScorer()
+    return ThreadingHTTPServer((host, port), make_handler(scorer))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Puntaje de riesgo de alta gravedad con el modelo entrenado.")
+    parser.add_argument('--modelo', default=None, help="Artefacto a usar (por defecto, el más reciente).")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    batch = subparsers.add_parser('batch', help="Puntuar un archivo CSV o Parquet por bloques.")
+    batch.add_argument('--input', required=True)
+    batch.add_argument('--output', required=True)
+    batch.add_argument('--chunksize', type=int, default=default_chunksize)
+
+    serve = subparsers.add_parser('serve', help="Servicio HTTP local: POST /score, GET /health.")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=default_port)
+    args = parser.parse_args(argv)
+
+    scorer = RiskScorer(load_model_artifact(args.modelo))
+    if args.command == 'batch':
+        score_file(args.input, args.output, scorer, chunksize=args.chunksize)
+    else:
+        server = make_server(scorer, args.host, args.port)
+        print(f"Modelo v{scorer.version} escuchando en http://{args.host}:{args.port}/score")
+        server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_store import load_table, save_table
+
+# --- Índice Espacial Hexagonal ---
+# Cada siniestro se asigna a una celda hexagonal (coordenadas axiales q, r) de una malla
+# sobre una proyección local de Bogotá, en varias resoluciones. Se guardan solo los conteos
+# por celda × hora × gravedad; el mapa del dashboard suma esos conteos para la vista actual
+# en lugar de enviar cada punto al navegador. El índice se guarda junto al dataset limpio.
+HEX_INDEX_PATH = "siniestros_hexagonos.parquet"
+
+# Lado del hexágono (centro a vértice) en km por resolución; 0 es la más gruesa
+RESOLUTIONS = {0: 2.0, 1: 0.8, 2: 0.3}
+# Origen de la proyección local y límites de coordenadas válidas (el resto se descarta)
+ORIGIN_LAT, ORIGIN_LON = 4.65, -74.10
+BOUNDS = {'lat': (3.70, 5.00), 'lon': (-74.60, -73.60)}
+KM_PER_DEG_LAT = 110.574
+KM_PER_DEG_LON = 111.320 * np.cos(np.radians(ORIGIN_LAT))
+N_HORAS = 24
+# Posición adicional para registros sin hora válida (como en dashboard_cube)
+MISSING_HORA = N_HORAS
+
+
+def hex_index_path(cleaned_path):
+    """Ruta del índice hexagonal en el mismo directorio que el dataset limpio `cleaned_path`."""
+    return os.path.join(os.path.dirname(cleaned_path), HEX_INDEX_PATH)
+
+
+def _to_km(lat, lon):
+    return (lon - ORIGIN_LON) * KM_PER_DEG_LON, (lat - ORIGIN_LAT) * KM_PER_DEG_LAT
+
+
+def hex_cells(lat, lon, size_km):
+    """Coordenadas axiales (q, r) de la celda hexagonal (vértice arriba) de cada punto."""
+    x, y = _to_km(np.asarray(lat, dtype=float), np.asarray(lon, dtype=float))
+    q = (np.sqrt(3) / 3 * x - y / 3) / size_km
+    r = (2 / 3 * y) / size_km
+    # Redondeo en coordenadas cúbicas: se corrige el eje con mayor error de redondeo
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    return rq.astype(np.int32), rr.astype(np.int32)
+
+
+def hex_centers(q, r, size_km):
+    """Latitud y longitud del centro de cada celda."""
+    x = size_km * np.sqrt(3) * (q + r / 2)
+    y = size_km * 1.5 * r
+    return ORIGIN_LAT + y / KM_PER_DEG_LAT, ORIGIN_LON + x / KM_PER_DEG_LON
+
+
+def hex_polygons(q, r, size_km):
+    """Vértices (lon, lat) de cada celda: arreglo (celdas, 7, 2) con el polígono cerrado."""
+    lat, lon = hex_centers(np.asarray(q), np.asarray(r), size_km)
+    angles = np.radians(30 + 60 * np.arange(7))
+    vertex_lon = lon[:, None] + size_km * np.cos(angles)[None, :] / KM_PER_DEG_LON
+    vertex_lat = lat[:, None] + size_km * np.sin(angles)[None, :] / KM_PER_DEG_LAT
+    return np.stack([vertex_lon, vertex_lat], axis=-1)
+
+
+def build_hex_counts(latitud, longitud, hora_del_dia, gravedad_binaria):
+    """
+    Conteos por resolución × celda × hora × gravedad en formato largo.
+
+    Los conteos son aditivos: los de varios lotes se combinan con `combine_hex_counts`.
+    """
+    lat = pd.to_numeric(latitud, errors='coerce').to_numpy(dtype=float)
+    lon = pd.to_numeric(longitud, errors='coerce').to_numpy(dtype=float)
+    valid = ((lat >= BOUNDS['lat'][0]) & (lat <= BOUNDS['lat'][1])
+             & (lon >= BOUNDS['lon'][0]) & (lon <= BOUNDS['lon'][1]))
+    hora = hora_del_dia.fillna(MISSING_HORA).to_numpy(dtype=np.int16)[valid]
+    gravedad = gravedad_binaria.to_numpy(dtype=np.int8)[valid]
+    lat, lon = lat[valid], lon[valid]
+
+    frames = []
+    for resolution, size_km in RESOLUTIONS.items():
+        q, r = hex_cells(lat, lon, size_km)
+        cells = pd.DataFrame({'q': q, 'r': r, 'hora_del_dia': hora, 'gravedad_binaria': gravedad})
+        counts = cells.groupby(list(cells.columns)).size().rename('conteo').reset_index()
+        counts.insert(0, 'resolucion', np.int8(resolution))
+        frames.append(counts)
+    return _compact(pd.concat(frames, ignore_index=True))
+
+
+def combine_hex_counts(frames):
+    """Suma los conteos de varios lotes (procesamiento por lotes de la preparación)."""
+    combined = pd.concat(frames, ignore_index=True)
+    keys = ['resolucion', 'q', 'r', 'hora_del_dia', 'gravedad_binaria']
+    return _compact(combined.groupby(keys)['conteo'].sum().reset_index())
+
+
+def _compact(counts):
+    return counts.astype({'resolucion': 'int8', 'q': 'int32', 'r': 'int32', 'hora_del_dia': 'int8',
+                          'gravedad_binaria': 'int8', 'conteo': 'int64'})
+
+
+def save_hex_index(counts, path=HEX_INDEX_PATH):
+    save_table(counts, path)
+
+
+class HexIndex:
+    """
+    Índice en memoria para el mapa: por resolución, un arreglo denso celdas × hora × gravedad.
+
+    Una consulta suma el rango de horas y las gravedades seleccionadas y filtra las celdas
+    cuyo centro cae en la vista; el costo depende del número de celdas, no de siniestros.
+    """
+
+    def __init__(self, counts):
+        self.levels = {}
+        for resolution, group in counts.groupby('resolucion'):
+            cells, cell_idx = np.unique(group[['q', 'r']].to_numpy(), axis=0, return_inverse=True)
+            dense = np.zeros((len(cells), N_HORAS + 1, 2), dtype=np.int64)
+            np.add.at(dense, (cell_idx.ravel(), group['hora_del_dia'].to_numpy(), group['gravedad_binaria'].to_numpy()),
+                      group['conteo'].to_numpy())
+            lat, lon = hex_centers(cells[:, 0], cells[:, 1], RESOLUTIONS[int(resolution)])
+            self.levels[int(resolution)] = {'q': cells[:, 0], 'r': cells[:, 1], 'lat': lat, 'lon': lon,
+                                            'counts': dense}
+
+    @classmethod
+    def load(cls, path=HEX_INDEX_PATH):
+        return cls(load_table(path))
+
+    def query(self, resolution, hour_range=(0, N_HORAS - 1), gravedad=(0, 1), bbox=None, max_cells=None):
+        """
+        Celdas con siniestros para la selección: devuelve (q, r, conteos).
+
+        `bbox` es (lat_min, lat_max, lon_min, lon_max); `max_cells` conserva las celdas con más
+        siniestros para acotar lo que se envía al navegador. Si ninguna coordenada cayó dentro
+        de `BOUNDS`, la resolución no existe y se devuelven arreglos vacíos.
+        """
+        if resolution not in self.levels:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty
+        level = self.levels[resolution]
+        hours = slice(hour_range[0], hour_range[1] + 1)
+        grav = [g for g in (0, 1) if g in set(gravedad or [])]
+        totals = level['counts'][:, hours, :][:, :, grav].sum(axis=(1, 2))
+        mask = totals > 0
+        if bbox is not None:
+            lat_min, lat_max, lon_min, lon_max = bbox
+            mask &= ((level['lat'] >= lat_min) & (level['lat'] <= lat_max)
+                     & (level['lon'] >= lon_min) & (level['lon'] <= lon_max))
+        idx = np.flatnonzero(mask)
+        if max_cells is not None and len(idx) > max_cells:
+            idx = idx[np.argsort(totals[idx])[-max_cells:]]
+        return level['q'][idx], level['r'][idx], totals[idx]
@@ -0,0 +1,155 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from data_store import ChunkedTableWriter
+
+# --- Configuración ---
+# Límite de filas de una hoja de Excel (1.048.576 incluyendo el encabezado)
+XLSX_MAX_ROWS = 1_048_575
+default_chunk_rows = 500_000
+default_start = '2015-01-01'
+default_years = 8
+
+# Centroide aproximado (latitud, longitud) y peso relativo de siniestros de cada localidad de Bogotá
+LOCALIDADES = {
+    1: (4.710, -74.030, 7), 2: (4.650, -74.060, 5), 3: (4.600, -74.070, 2), 4: (4.560, -74.090, 3),
+    5: (4.500, -74.110, 2), 6: (4.580, -74.140, 2), 7: (4.620, -74.190, 5), 8: (4.630, -74.160, 10),
+    9: (4.670, -74.140, 7), 10: (4.700, -74.110, 9), 11: (4.740, -74.080, 10), 12: (4.670, -74.080, 4),
+    13: (4.640, -74.090, 4), 14: (4.600, -74.090, 3), 15: (4.590, -74.110, 2), 16: (4.610, -74.120, 6),
+    17: (4.595, -74.075, 1), 18: (4.570, -74.120, 3), 19: (4.560, -74.160, 5), 20: (4.300, -74.300, 1),
+}
+CLASES = ['Choque', 'Atropello', 'Volcamiento', 'Caida Ocupante', 'Autolesion', 'Otro']
+CLASE_PESOS = [0.72, 0.12, 0.03, 0.08, 0.01, 0.04]
+CHOQUES = ['Vehiculo', 'Objeto Fijo', 'Semoviente', 'Tren']
+OBJETOS_FIJOS = ['Poste', 'Muro', 'Arbol', 'Baranda', 'Separador', 'Otro']
+DISENOS_LUGAR = ['Tramo de Via', 'Interseccion', 'Glorieta', 'Puente', 'Via Peatonal', 'Paso Elevado']
+DISENO_PESOS = [0.55, 0.33, 0.04, 0.03, 0.02, 0.03]
+# Más siniestros en las horas pico de la mañana y de la tarde
+HORA_PESOS = np.array([2, 1.5, 1.2, 1, 1.2, 3, 5, 6, 5, 4, 4, 4.5, 5, 5, 5, 5, 5.5, 6.5, 6.5, 5, 4, 3.5, 3, 2.5])
+
+
+def generate_chunk(rows, rng, start=default_start, years=default_years):
+    """
+    Genera `rows` siniestros con el esquema del consolidado (columnas en mayúsculas, fecha y hora
+    como texto). La gravedad depende de la clase, la hora y el día, para que el modelo tenga señal.
+    """
+    days = rng.integers(0, int(years * 365.25), rows)
+    hours = rng.choice(24, size=rows, p=HORA_PESOS / HORA_PESOS.sum())
+    seconds = rng.integers(0, 3600, rows)
+    timestamps = (pd.Timestamp(start) + pd.to_timedelta(days, unit='D')
+                  + pd.to_timedelta(hours * 3600 + seconds, unit='s'))
+    # 'YYYY-MM-DDTHH:MM:SS' con numpy (mucho más rápido que strftime); fecha y hora se separan
+    # reinterpretando cada texto como 19 caracteres
+    texto = np.datetime_as_string(timestamps.values, unit='s').astype('U19')
+    caracteres = texto.view('U1').reshape(rows, 19)
+    fecha = caracteres[:, :10].copy().view('U10').ravel()
+    hora = caracteres[:, 11:].copy().view('U8').ravel()
+
+    codigos = np.array(list(LOCALIDADES))
+    pesos = np.array([LOCALIDADES[c][2] for c in codigos], dtype=float)
+    localidad = rng.choice(codigos, size=rows, p=pesos / pesos.sum())
+    centroides = np.array([LOCALIDADES[c][:2] for c in codigos])[localidad - 1]
+
+    clase_idx = rng.choice(len(CLASES), size=rows, p=CLASE_PESOS)
+    clase = np.array(CLASES, dtype=object)[clase_idx]
+    es_choque = clase_idx == 0
+    choque = np.where(es_choque, rng.choice(CHOQUES, size=rows, p=[0.85, 0.13, 0.015, 0.005]), None)
+    objeto_fijo = np.where(choque == 'Objeto Fijo', rng.choice(OBJETOS_FIJOS, size=rows), None)
+    diseno = rng.choice(np.array(DISENOS_LUGAR, dtype=object), size=rows, p=DISENO_PESOS)
+    # Algunos registros sin diseño del lugar, como en el consolidado
+    diseno[rng.random(rows) < 0.02] = None
+
+    # Probabilidad de lesionados o muertos: mayor en atropellos, caídas, de noche y en fin de semana
+    logit = (-0.8 + 1.6 * (clase_idx == 1) + 1.0 * (clase_idx == 3) + 0.5 * (clase_idx == 2)
+             + 0.6 * ((hours >= 22) | (hours <= 4)) + 0.3 * (timestamps.dayofweek >= 5))
+    grave = rng.random(rows) < 1 / (1 + np.exp(-logit))
+    muerto = grave & (rng.random(rows) < 0.03)
+    gravedad = np.where(muerto, 3, np.where(grave, 2, 1))
+
+    return pd.DataFrame({
+        'FECHA': fecha,
+        'HORA': hora,
+        'GRAVEDAD': gravedad,
+        'CLASE': clase,
+        'CHOQUE': choque,
+        'OBJETO_FIJO': objeto_fijo,
+        'DISENO_LUGAR': diseno,
+        'CODIGO_LOCALIDAD': localidad,
+        'LATITUD': np.round(centroides[:, 0] + rng.normal(0, 0.012, rows), 6),
+        'LONGITUD': np.round(centroides[:, 1] + rng.normal(0, 0.012, rows), 6),
+    })
+
+
+def iter_synthetic_chunks(rows, seed=42, chunk_rows=default_chunk_rows, **kwargs):
+    """Genera el dataset por lotes; con el mismo `seed` y `chunk_rows` las filas son siempre las mismas."""
+    for i, offset in enumerate(range(0, rows, chunk_rows)):
+        rng = np.random.default_rng([seed, i])
+        yield generate_chunk(min(chunk_rows, rows - offset), rng, **kwargs)
+
+
+def _write_xlsx(path, chunks):
+    # Libro en modo write_only: las filas se escriben en streaming, sin mantener la hoja en memoria
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    header_written = False
+    for chunk in chunks:
+        if not header_written:
+            sheet.append(list(chunk.columns))
+            header_written = True
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        for row in chunk.itertuples(index=False, name=None):
+            sheet.append(row)
+    workbook.save(path)
+
+
+def write_synthetic_data(path, rows, seed=42, chunk_rows=default_chunk_rows, **kwargs):
+    """
+    Escribe un dataset sintético de `rows` filas en Parquet, CSV o XLSX según la extensión.
+
+    Se genera y escribe por lotes, así que la memoria no crece con el tamaño (de 10 mil a
+    decenas de millones de filas). XLSX admite como máximo `XLSX_MAX_ROWS` filas.
+    """
+    if path.endswith('.xlsx') and rows > XLSX_MAX_ROWS:
+        raise ValueError(f"Un archivo XLSX admite como máximo {XLSX_MAX_ROWS} filas; usa .parquet o .csv.")
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    chunks = iter_synthetic_chunks(rows, seed=seed, chunk_rows=chunk_rows, **kwargs)
+    if path.endswith('.parquet'):
+        with ChunkedTableWriter(path) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    elif path.endswith('.csv'):
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    elif path.endswith('.xlsx'):
+        _write_xlsx(path, chunks)
+    else:
+        raise ValueError(f"Formato no soportado: {path} (usa .parquet, .csv o .xlsx)")
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera siniestros viales sintéticos con el esquema del consolidado de Bogotá.")
+    parser.add_argument('--filas', type=int, default=100_000)
+    parser.add_argument('--salida', default="siniestros_sinteticos.parquet", help="Archivo .parquet, .csv o .xlsx.")
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--desde', default=default_start, help="Fecha inicial (YYYY-MM-DD).")
+    parser.add_argument('--anios', type=float, default=default_years, help="Años cubiertos a partir de --desde.")
+    parser.add_argument('--filas-por-lote', type=int, default=default_chunk_rows)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    write_synthetic_data(args.salida, args.filas, seed=args.semilla, chunk_rows=args.filas_por_lote,
+                         start=args.desde, years=args.anios)
+    print(f"{args.filas} siniestros sintéticos escritos en {args.salida} en {time.perf_counter() - start:.1f} s.")
+
+
+if __name__ == "__main__":
+    main()
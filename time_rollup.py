@@ -0,0 +1,162 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_store import load_table, save_table
+
+# --- Serie Temporal Multirresolución ---
+# Los siniestros se cuentan por periodo × localidad × gravedad en cuatro resoluciones
+# (hora, día, semana, mes). Cada resolución guarda un índice ordenado con el inicio de los
+# periodos observados; un rango de fechas se resuelve con búsqueda binaria sobre ese índice
+# y sumando la resolución más fina cuyo número de periodos cabe en el límite de puntos.
+# La serie se guarda junto al dataset limpio.
+TIME_ROLLUP_PATH = "siniestros_serie_temporal.parquet"
+
+# Resoluciones de la más fina a la más gruesa
+RESOLUTIONS = ['hora', 'dia', 'semana', 'mes']
+RESOLUTION_LABELS = {'hora': 'hora', 'dia': 'día', 'semana': 'semana', 'mes': 'mes'}
+# El 1970-01-01 (día 0 de numpy) fue jueves: desplazamiento para que las semanas empiecen el lunes
+_EPOCH_WEEKDAY = 3
+
+
+def time_rollup_path(cleaned_path):
+    """Ruta de la serie temporal en el mismo directorio que el dataset limpio `cleaned_path`."""
+    return os.path.join(os.path.dirname(cleaned_path), TIME_ROLLUP_PATH)
+
+
+def period_starts(fecha_hora, resolution):
+    """Inicio del periodo (datetime64[ns]) de cada fecha para la resolución dada."""
+    values = np.asarray(fecha_hora, dtype='datetime64[ns]')
+    if resolution == 'hora':
+        starts = values.astype('datetime64[h]')
+    elif resolution == 'dia':
+        starts = values.astype('datetime64[D]')
+    elif resolution == 'semana':
+        days = values.astype('datetime64[D]').astype(np.int64)
+        starts = (days - (days + _EPOCH_WEEKDAY) % 7).astype('datetime64[D]')
+    elif resolution == 'mes':
+        starts = values.astype('datetime64[M]')
+    else:
+        raise ValueError(f"Resolución desconocida: {resolution} (opciones: {RESOLUTIONS})")
+    return starts.astype('datetime64[ns]')
+
+
+def build_time_rollup(fecha_hora_accidente, codigo_localidad, gravedad_binaria):
+    """
+    Conteos por resolución × periodo × localidad × gravedad en formato largo.
+
+    Los registros sin fecha válida se descartan. Los conteos son aditivos: los de varios
+    lotes se combinan con `combine_time_rollups`.
+    """
+    valid = fecha_hora_accidente.notna().to_numpy()
+    fecha_hora = fecha_hora_accidente.to_numpy(dtype='datetime64[ns]')[valid]
+    base = pd.DataFrame({'codigo_localidad': codigo_localidad.to_numpy()[valid],
+                         'gravedad_binaria': gravedad_binaria.to_numpy(dtype=np.int8)[valid]})
+
+    frames = []
+    for resolution in RESOLUTIONS:
+        base['periodo'] = period_starts(fecha_hora, resolution)
+        counts = base.groupby(['periodo', 'codigo_localidad', 'gravedad_binaria'], dropna=False,
+                              observed=True).size().rename('conteo').reset_index()
+        counts.insert(0, 'resolucion', resolution)
+        frames.append(counts)
+    return _compact(pd.concat(frames, ignore_index=True))
+
+
+def combine_time_rollups(frames):
+    """Suma los conteos de varios lotes (procesamiento por lotes de la preparación)."""
+    combined = pd.concat(frames, ignore_index=True)
+    keys = ['resolucion', 'periodo', 'codigo_localidad', 'gravedad_binaria']
+    return _compact(combined.groupby(keys, dropna=False, observed=True)['conteo'].sum().reset_index())
+
+
+def _compact(counts):
+    return counts.astype({'resolucion': pd.CategoricalDtype(RESOLUTIONS), 'gravedad_binaria': 'int8',
+                          'conteo': 'int64'})
+
+
+def save_time_rollup(counts, path=TIME_ROLLUP_PATH):
+    save_table(counts, path)
+
+
+class TimeRollup:
+    """
+    Serie temporal en memoria para el dashboard: por resolución, el índice ordenado de
+    periodos y un arreglo denso periodos × localidad × gravedad.
+
+    Una consulta ubica el rango con `searchsorted` y suma las localidades y gravedades
+    seleccionadas, así que el costo depende del número de periodos devueltos y no de
+    cuántos años o siniestros haya cargados.
+    """
+
+    def __init__(self, counts, localidad_names=None):
+        # Nombre de localidad por código (los códigos sin nombre quedan como 'Desconocida')
+        names = counts['codigo_localidad']
+        if localidad_names is not None:
+            names = names.map(localidad_names).fillna('Desconocida')
+        loc_codes, self.localidades = pd.factorize(names, sort=True)
+        self.localidades = np.asarray(self.localidades)
+
+        self.levels = {}
+        for resolution in RESOLUTIONS:
+            mask = (counts['resolucion'] == resolution).to_numpy()
+            if not mask.any():
+                continue
+            periods, period_idx = np.unique(counts['periodo'].to_numpy(dtype='datetime64[ns]')[mask],
+                                            return_inverse=True)
+            dense = np.zeros((len(periods), len(self.localidades), 2), dtype=np.int64)
+            np.add.at(dense, (period_idx.ravel(), loc_codes[mask], counts['gravedad_binaria'].to_numpy()[mask]),
+                      counts['conteo'].to_numpy()[mask])
+            self.levels[resolution] = {'periodos': periods, 'counts': dense}
+
+    @classmethod
+    def load(cls, path=TIME_ROLLUP_PATH, localidad_names=None):
+        return cls(load_table(path), localidad_names)
+
+    def date_range(self):
+        """Primer y último día con siniestros (None si no hay fechas válidas)."""
+        if 'dia' not in self.levels:
+            return None
+        periods = self.levels['dia']['periodos']
+        return pd.Timestamp(periods[0]), pd.Timestamp(periods[-1])
+
+    def choose_resolution(self, start, end, max_points):
+        """Resolución más fina con a lo sumo `max_points` periodos en [start, end)."""
+        for resolution in RESOLUTIONS:
+            lo, hi = self._bounds(resolution, start, end)
+            if hi - lo <= max_points:
+                return resolution
+        return RESOLUTIONS[-1]
+
+    def _bounds(self, resolution, start, end):
+        periods = self.levels[resolution]['periodos']
+        # Periodos que empiezan dentro del rango; el del inicio se incluye si contiene a `start`
+        start = period_starts([np.datetime64(start, 'ns')], resolution)[0]
+        lo = np.searchsorted(periods, start, side='left')
+        hi = np.searchsorted(periods, np.datetime64(end, 'ns'), side='left')
+        return lo, hi
+
+    def query(self, start, end, selected_localidades=None, selected_gravedad=(0, 1), max_points=600):
+        """
+        Serie de conteos para [start, end): devuelve (resolución, periodos, conteos por gravedad).
+
+        `conteos` tiene forma (puntos, 2). Solo hay puntos para los periodos con siniestros, y
+        en resoluciones gruesas los extremos del rango se extienden al periodo completo. Si ni
+        la resolución mensual cabe en `max_points`, los meses consecutivos se agrupan para no
+        superar el límite.
+        """
+        resolution = self.choose_resolution(start, end, max_points)
+        level = self.levels[resolution]
+        lo, hi = self._bounds(resolution, start, end)
+        loc_mask = np.isin(self.localidades, list(selected_localidades or []))
+        grav_mask = np.isin(np.arange(2), list(selected_gravedad or []))
+
+        counts = level['counts'][lo:hi][:, loc_mask, :].sum(axis=1) * grav_mask
+        periods = level['periodos'][lo:hi]
+        if len(periods) > max_points:
+            step = -(-len(periods) // max_points)
+            starts = np.arange(0, len(periods), step)
+            counts = np.add.reduceat(counts, starts, axis=0)
+            periods = periods[starts]
+        return resolution, periods, counts
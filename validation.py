@@ -0,0 +1,177 @@
+import argparse
+import json
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from data_store import CLEANED_DATA_PATH
+from instrumentation import span
+
+# --- Configuración ---
+# Reporte de la última validación (se escribe también cuando la validación falla)
+validation_report_path = "validation_report.json"
+# Filas por lote al recorrer el Parquet limpio
+batch_rows = 1_000_000
+
+GRAVEDAD_VALIDA = [1, 2, 3]
+LOCALIDAD_MIN, LOCALIDAD_MAX = 1, 20
+
+# Tipo esperado de cada columna que usan el EDA, la codificación y el modelado
+EXPECTED_TYPES = {
+    'fecha_hora_accidente': ('fecha y hora', pa.types.is_timestamp),
+    # Con algún nulo, pandas guarda las columnas enteras como double; los nulos cuentan en 'gravedad_invalida'
+    'gravedad': ('numérico', lambda t: pa.types.is_integer(t) or pa.types.is_floating(t)),
+    'gravedad_binaria': ('entero', pa.types.is_integer),
+    'hora_del_dia': ('entero', pa.types.is_integer),
+    'codigo_localidad': ('numérico', lambda t: pa.types.is_integer(t) or pa.types.is_floating(t)),
+    'dia_semana': ('categoría o texto', lambda t: pa.types.is_dictionary(t) or pa.types.is_string(t)
+                   or pa.types.is_large_string(t)),
+}
+
+# Umbrales: fracción máxima de filas inválidas y rango aceptado para la proporción de Alta Gravedad.
+# Los siniestros graves deben ser la minoría: más de la mitad indica que 'gravedad' se interpretó al revés.
+THRESHOLDS = {
+    'gravedad_invalida': 0.001,
+    'fecha_nula': 0.01,
+    'localidad_invalida': 0.01,
+    'proporcion_grave': (0.01, 0.5),
+}
+# Columna que revisa cada chequeo de calidad; un chequeo se omite si su columna no existe
+CHECK_COLUMNS = {
+    'gravedad_invalida': 'gravedad',
+    'fecha_nula': 'fecha_hora_accidente',
+    'localidad_invalida': 'codigo_localidad',
+    'proporcion_grave': 'gravedad_binaria',
+}
+
+
+class ValidationError(Exception):
+    """El dataset limpio no cumple el esquema o algún umbral de calidad."""
+
+
+# --- 1. Chequeos de Esquema ---
+
+def check_schema(schema):
+    """Un resultado por columna esperada: presente y con un tipo compatible."""
+    results = []
+    for col, (expected, is_valid) in EXPECTED_TYPES.items():
+        field = schema.field(col) if col in schema.names else None
+        results.append({
+            'chequeo': f"tipo_{col}",
+            'valor': str(field.type) if field is not None else "ausente",
+            'esperado': expected,
+            'ok': field is not None and bool(is_valid(field.type)),
+        })
+    return results
+
+
+# --- 2. Chequeos de Calidad (una sola pasada por lotes) ---
+
+class QualityAccumulator:
+    """Acumula lote a lote los conteos de filas inválidas; cada lote se revisa con operaciones vectorizadas."""
+
+    def __init__(self, checks=tuple(CHECK_COLUMNS)):
+        self.checks = list(checks)
+        self.rows = 0
+        self.counts = dict.fromkeys(self.checks, 0)
+        self.gravedad_values = pd.Series(dtype='int64')
+
+    def update(self, df):
+        self.rows += len(df)
+        if 'gravedad_invalida' in self.checks:
+            # Nulos y valores distintos de 1, 2 y 3 son inválidos
+            gravedad = pd.to_numeric(df['gravedad'], errors='coerce')
+            self.counts['gravedad_invalida'] += int((~gravedad.isin(GRAVEDAD_VALIDA)).sum())
+            self.gravedad_values = self.gravedad_values.add(gravedad.value_counts(dropna=False), fill_value=0)
+        if 'fecha_nula' in self.checks:
+            self.counts['fecha_nula'] += int(df['fecha_hora_accidente'].isna().sum())
+        if 'localidad_invalida' in self.checks:
+            # Códigos nulos, fuera de 1–20 o no enteros (p. ej. 5.5) son inválidos
+            localidad = pd.to_numeric(df['codigo_localidad'], errors='coerce').to_numpy(dtype=np.float64)
+            valid = (localidad >= LOCALIDAD_MIN) & (localidad <= LOCALIDAD_MAX) & (localidad % 1 == 0)
+            self.counts['localidad_invalida'] += int(np.count_nonzero(~valid))
+        if 'proporcion_grave' in self.checks:
+            target = pd.to_numeric(df['gravedad_binaria'], errors='coerce').to_numpy(dtype=np.float64)
+            self.counts['proporcion_grave'] += int(np.count_nonzero(target == 1))
+
+    def results(self, thresholds):
+        rows = max(self.rows, 1)
+        results = [{'chequeo': 'filas', 'valor': self.rows, 'umbral': "> 0", 'ok': self.rows > 0}]
+        for name in self.checks:
+            rate = self.counts[name] / rows
+            if name == 'proporcion_grave':
+                low, high = thresholds[name]
+                results.append({'chequeo': name, 'valor': rate, 'umbral': [low, high], 'ok': low <= rate <= high})
+            else:
+                results.append({'chequeo': name, 'valor': rate, 'filas': self.counts[name],
+                                'umbral': thresholds[name], 'ok': rate <= thresholds[name]})
+        return results
+
+
+def validate_data(path=CLEANED_DATA_PATH, report_path=validation_report_path, thresholds=None):
+    """
+    Valida el dataset limpio antes del EDA y el modelado.
+
+    Revisa el esquema (columnas y tipos) y, en una sola pasada por lotes, los valores de
+    'gravedad', la tasa de fechas nulas, los códigos de localidad y la proporción de Alta
+    Gravedad. Los chequeos de valores se ejecutan para todas las columnas presentes, aunque
+    falle el chequeo de tipo de alguna, para que el reporte muestre siempre las tasas.
+    Escribe el reporte JSON y lanza `ValidationError` si algún chequeo no se cumple.
+    """
+    thresholds = {**THRESHOLDS, **(thresholds or {})}
+    parquet_file = pq.ParquetFile(path)
+    results = check_schema(parquet_file.schema_arrow)
+    checks = [name for name, col in CHECK_COLUMNS.items() if col in parquet_file.schema_arrow.names]
+    accumulator = QualityAccumulator(checks)
+
+    with span('validacion.calidad') as sp:
+        columns = list(dict.fromkeys(CHECK_COLUMNS[name] for name in checks))
+        for batch in parquet_file.iter_batches(batch_size=batch_rows, columns=columns):
+            accumulator.update(batch.to_pandas())
+        sp.rows = accumulator.rows
+    results += accumulator.results(thresholds)
+
+    failures = [result for result in results if not result['ok']]
+    report = {
+        'archivo': path,
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'filas': accumulator.rows,
+        'valido': not failures,
+        'chequeos': results,
+        'valores_gravedad': {str(k): int(v) for k, v in accumulator.gravedad_values.items()},
+    }
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Reporte de validación guardado en: {report_path}")
+
+    if failures:
+        detail = "; ".join(f"{r['chequeo']}={_format_value(r['valor'])} (umbral: {r.get('umbral', r.get('esperado'))})"
+                           for r in failures)
+        raise ValidationError(f"El dataset limpio no pasó la validación: {detail}")
+    print(f"Validación superada: {len(results)} chequeos sobre {accumulator.rows} filas.")
+    return report
+
+
+def _format_value(value):
+    return f"{value:.4f}" if isinstance(value, float) else value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validación de esquema y calidad del dataset limpio.")
+    parser.add_argument('--input', default=CLEANED_DATA_PATH, help="Parquet limpio a validar.")
+    parser.add_argument('--reporte', default=validation_report_path, help="Ruta del reporte JSON.")
+    args = parser.parse_args(argv)
+
+    try:
+        validate_data(args.input, args.reporte)
+    except ValidationError as e:
+        print(f"Error de validación: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+# Punto de entrada para producción (gunicorn).
+# Con --preload la aplicación se crea una sola vez en el proceso maestro y los workers
+# la heredan por fork, compartiendo en memoria el cubo de conteos:
+#   gunicorn --preload -w 4 -b 0.0.0.0:8050 wsgi:server
+from app_dashboard import create_app
+
+app = create_app()
+server = app.server